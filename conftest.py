@@ -0,0 +1,51 @@
+# Copyright (c) 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Hooks that have to be in place before pytest parses its arguments and before pytest-xdist starts its workers. pytest
+# only loads this conftest that early because it lives in the root directory, hopic/test/conftest.py gets loaded too late.
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-slow", action="store_true", default=False, help="also execute tests marked as slow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+
+    skip_slow = pytest.mark.skip(reason="slow test, use --run-slow to execute")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+def pytest_configure(config):
+    # The tests create lots of small, short-lived files, mostly git repositories. Keep those on a RAM backed file system,
+    # when there's one with plenty of space, unless the user explicitly chose a location.
+    # HOPIC_TEST_TMPFS selects a different RAM backed file system, or none when empty.
+    tmpfs = os.environ.get("HOPIC_TEST_TMPFS")
+    if tmpfs is None and "TMPDIR" not in os.environ:
+        tmpfs = "/dev/shm"
+        if not (os.path.isdir(tmpfs) and os.access(tmpfs, os.W_OK) and shutil.disk_usage(tmpfs).free >= 1024 ** 3):
+            tmpfs = None
+    if config.option.basetemp is None and tmpfs:
+        # Applies to git and other subprocesses as well
+        os.environ["TMPDIR"] = tmpfs
+        tempfile.tempdir = None
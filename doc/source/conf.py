@@ -97,10 +97,9 @@
     version = get_version(root='../..', relative_to=__file__)
     sys.path.insert(0, root_dir)
 else:
-    try:
-        # Python >= 3.8
+    if sys.version_info[:2] >= (3, 8):
         from importlib import metadata
-    except ImportError:
+    else:
         import importlib_metadata as metadata
     version = metadata.version(pkg_name)
 
@@ -15,6 +15,7 @@
 import logging
 import os
 import os.path
+import shutil
 import sys
 from functools import (
     partial,
@@ -24,6 +25,7 @@
     Path,
     PurePath,
 )
+from textwrap import dedent
 from typing import (
     AbstractSet,
     Any,
@@ -42,6 +44,7 @@
 import pytest
 from click import ClickException
 from click.testing import CliRunner
+from filelock import FileLock
 from typeguard import typechecked
 
 from ..cli import utils
@@ -77,10 +80,122 @@ def read(self) -> str:
         author=_author,
         committer=_author,
     )
+# Every command gets invoked in-process. The runner keeps no state between invocations, so all tests share it.
+_runner = CliRunner(mix_stderr=False)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _frozen_git_config(tmp_path_factory):
+    """Shield every git command executed by the tests from the user's and the system's git configuration."""
+    # GitPython reads ~/.gitconfig itself instead of honoring GIT_CONFIG_GLOBAL, so give it the same file in an empty home
+    home = tmp_path_factory.mktemp("home")
+    config = home / ".gitconfig"
+    # Keep new repositories and clones down to the bare minimum instead of filling them with sample hooks and descriptions
+    templates = tmp_path_factory.mktemp("gittemplate")
+    config.write_text(dedent(
+        f"""\
+        [core]
+        \thooksPath = {os.devnull}
+        \tfsmonitor = false
+        \tpreloadIndex = true
+        \tfsync = none
+        \tautocrlf = false
+        [gc]
+        \tauto = 0
+        [commit]
+        \tgpgSign = false
+        [tag]
+        \tgpgSign = false
+        [init]
+        \tdefaultBranch = master
+        \ttemplateDir = {templates}
+        [pack]
+        \tthreads = 1
+        """
+    ))
+    config.chmod(0o444)
+
+    with pytest.MonkeyPatch.context() as m:
+        m.setenv("HOME", str(home))
+        m.delenv("XDG_CONFIG_HOME", raising=False)
+        m.setenv("GIT_CONFIG_GLOBAL", str(config))
+        m.setenv("GIT_CONFIG_SYSTEM", str(config))
+        m.setenv("GIT_OPTIONAL_LOCKS", "0")
+        m.setenv("GIT_TERMINAL_PROMPT", "0")
+        yield config
+
+
+def _init_toprepo_template(template):
+    with git.Repo.init(template, expand_vars=False) as repo:
+        # Independent of the user's init.defaultBranch, the tests expect this name
+        repo.git.symbolic_ref("HEAD", "refs/heads/master")
+        with repo.config_writer() as cfg:
+            cfg.set_value("user", "name", _author.name)
+            cfg.set_value("user", "email", _author.email)
+    return template
+
+
+@pytest.fixture(scope="session")
+def _base_toprepo_template(tmp_path_factory):
+    """An empty repository that's copied for every test instead of initializing a new one each time."""
+    if "PYTEST_XDIST_WORKER" not in os.environ:
+        return _init_toprepo_template(tmp_path_factory.mktemp("tpl") / "repo")
+
+    # Every pytest-xdist worker has its own base temp dir, share a single template in their common parent instead
+    root = tmp_path_factory.getbasetemp().parent
+    template = root / "tpl" / "repo"
+    with FileLock(str(root / "tpl.lock")):
+        if not template.is_dir():
+            scratch = root / "tpl.tmp"
+            shutil.rmtree(scratch, ignore_errors=True)
+            _init_toprepo_template(scratch / "repo")
+            # Only make the template visible when complete to not expose half-initialized ones
+            os.rename(scratch, template.parent)
+    return template
+
+
+@pytest.fixture(scope="session")
+def _initial_commit_templates(_base_toprepo_template, tmp_path_factory):
+    """
+    Repositories with an initial commit, and optionally a tag on it, for run_hopic.init_toprepo() to copy.
+
+    Every distinct combination of files, tag and commit message only gets committed once and is shared by all tests starting from it.
+    """
+    templates = {}
+
+    def get_template(files, tag, message):
+        key = (tuple(sorted(files.items())), tag, message)
+        if key not in templates:
+            template = tmp_path_factory.mktemp("base") / "repo"
+            shutil.copytree(_base_toprepo_template, template, symlinks=True)
+            with git.Repo(template, expand_vars=False) as repo:
+                for path, content in files.items():
+                    path = template / path
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    if isinstance(content, bytes):
+                        path.write_bytes(content)
+                    else:
+                        path.write_text(content)
+                repo.index.add(files.keys())
+                repo.index.commit(message=message, **_commitargs)
+                if tag is not None:
+                    repo.create_tag(tag)
+            templates[key] = template
+        return templates[key]
+
+    return get_template
+
+
+def _replay(stream, data):
+    """Writes captured output to the binary buffer underneath the given text stream, without decoding it first."""
+    # Keep the order with text that was already written to the stream
+    stream.flush()
+    stream.buffer.write(data)
+    stream.buffer.flush()
 
 
 @pytest.fixture
-def run_hopic(caplog, monkeypatch, tmp_path):
+def run_hopic(_base_toprepo_template, _initial_commit_templates, caplog, monkeypatch, tmp_path):
     @typechecked
     def run_hopic(
         *args: Union[List, Tuple, Callable[[], Any]],
@@ -96,7 +211,6 @@ def run_hopic(
     ):
         result = None
         commit = None
-        runner = CliRunner(mix_stderr=False, env=env)
         umask = os.umask(umask)
         try:
             with monkeypatch.context() as dir_ctx:
@@ -139,41 +253,46 @@ def run_hopic(
                 else:
                     assert config is None and commit_count == 0 and dirty is False and tag is None
 
+                # All commands are executed in-process, sharing this single wrapper, instead of spawning one process per command
+                orig_main = hopic_cli.main
+                rv = []
+
+                @wraps(orig_main)
+                def mock_main(*args, **kwargs):
+                    with monkeypatch.context() as m:
+                        # Ensure pytest can capture our logging
+                        m.setattr(click_log, "basic_config", lambda: None)
+                        m.setattr(logging.getLogger("hopic"), "setLevel", lambda _: None)
+                        m.setattr(logging.getLogger("git"), "setLevel", lambda _: None)
+
+                        monkeypatch_injector(m)
+                        rv.append(orig_main(*args, **kwargs))
+                        return rv[-1]
+
                 for arg in args:
                     if callable(arg):
                         arg()
                         continue
 
-                    orig_main = hopic_cli.main
-                    rv = []
-
-                    @wraps(orig_main)
-                    def mock_main(*args, **kwargs):
-                        with monkeypatch.context() as m:
-                            # Ensure pytest can capture our logging
-                            m.setattr(click_log, "basic_config", lambda: None)
-                            m.setattr(logging.getLogger("hopic"), "setLevel", lambda _: None)
-                            m.setattr(logging.getLogger("git"), "setLevel", lambda _: None)
-
-                            monkeypatch_injector(m)
-                            rv.append(orig_main(*args, **kwargs))
-                            return rv[-1]
-
+                    # Don't let a command that exits without reaching main() pick up the previous command's return value
+                    rv.clear()
                     with monkeypatch.context() as call_ctx:
                         call_ctx.setattr(hopic_cli, "main", mock_main)
-                        result = runner.invoke(hopic_cli, [str(a) for a in arg], standalone_mode=False)
+                        result = _runner.invoke(hopic_cli, [str(a) for a in arg], env=env, standalone_mode=False)
+
+                    if isinstance(result.exception, ClickException):
+                        result.exit_code = result.exception.exit_code
+                    if result.exit_code == 0 and rv and isinstance(rv[-1], int):
+                        result.exit_code = rv[-1]
 
+                    # Always replay: the output is the main clue for diagnosing an assertion that fails afterwards
                     if result.stdout_bytes:
-                        print(result.stdout, end='')
+                        _replay(sys.stdout, result.stdout_bytes)
                     if result.stderr_bytes:
-                        print(result.stderr, end='', file=sys.stderr)
+                        _replay(sys.stderr, result.stderr_bytes)
 
                     if result.exception is not None and not isinstance(result.exception, (SystemExit, ClickException)):
                         raise result.exception
-                    if isinstance(result.exception, ClickException):
-                        result.exit_code = result.exception.exit_code
-                    if result.exit_code == 0 and isinstance(rv[-1], int):
-                        result.exit_code = rv[-1]
 
                     result.commit = commit
                     result.logs = tuple(
@@ -186,11 +305,28 @@ def mock_main(*args, **kwargs):
         finally:
             os.umask(umask)
 
+    def init_toprepo(files=None, tag=None, message="Initial commit"):
+        """
+        Creates the top repository from a template, which, when files are given, already has them in an initial commit.
+
+        The initial commit gets the given message, and gets tagged when a tag is given as well.
+        """
+        template = _base_toprepo_template if files is None else _initial_commit_templates(files, tag, message)
+        shutil.copytree(template, run_hopic.toprepo, symlinks=True)
+        # Kept open for the duration of the test to be reused after running hopic
+        run_hopic.repo = git.Repo(run_hopic.toprepo, expand_vars=False)
+        return run_hopic.repo
+
     run_hopic.toprepo = tmp_path / "repo"
+    run_hopic.init_toprepo = init_toprepo
+    run_hopic.repo = None
     # Make _all_ logging levels available for capture by pytest
     caplog.set_level("DEBUG", logger="git")
     caplog.set_level("DEBUG", logger="hopic")
-    return run_hopic
+    yield run_hopic
+
+    if run_hopic.repo is not None:
+        run_hopic.repo.close()
 
 
 @pytest.fixture(autouse=True)
@@ -1916,3 +1916,26 @@ def test_sh_command_after_global_finally_error():
             ),
             {"WORKSPACE": None},
         )
+
+
+def test_reread_modified_config(tmp_path):
+    cfg_file = tmp_path / "hopic-ci-config.yaml"
+    cfg_file.write_text(dedent(
+        '''\
+        phases:
+          test:
+            example:
+              - ./old.sh
+        '''
+    ))
+    cfg = config_reader.read(cfg_file, {'WORKSPACE': None})
+    (out,) = cfg['phases']['test']['example']
+    assert out['sh'] == ['./old.sh']
+
+    # Rewriting the file, even without changing its size and timestamps, should get picked up by the next read
+    st = cfg_file.stat()
+    cfg_file.write_text(cfg_file.read_text().replace("old", "new"))
+    os.utime(cfg_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    cfg = config_reader.read(cfg_file, {'WORKSPACE': None})
+    (out,) = cfg['phases']['test']['example']
+    assert out['sh'] == ['./new.sh']
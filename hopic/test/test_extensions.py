@@ -18,13 +18,18 @@
 import re
 import subprocess
 import sys
-from collections import OrderedDict
+from collections import (
+    OrderedDict,
+    deque,
+)
 from pathlib import Path
 from textwrap import dedent
 
 import git
 import pytest
 
+from .markers import slow
+
 from ..cli import utils
 from ..compat import metadata
 from ..errors import ConfigurationError
@@ -39,61 +44,64 @@
 )
 
 
+def _pip_install_args(args):
+    """Strip the environment dependent options from a 'pip install' command line."""
+    filtered = [arg for arg in args if arg not in ("--user", "--verbose")]
+    # strip ['-c', constraints_file]
+    return filtered[:4] + filtered[6:]
+
+
 @pytest.mark.parametrize(
-    "expected_args",
+    "expected_args, config",
     (
         (
-            "--extra-index-url",
-            "https://test.pypi.org/simple/",
-            "hopic>=1.19<2",
+            (
+                "--extra-index-url",
+                "https://test.pypi.org/simple/",
+                "hopic>=1.19<2",
+            ),
+            dedent(
+                """\
+                pip:
+                  - with-extra-index:
+                      - https://test.pypi.org/simple/
+                    packages:
+                      - hopic>=1.19<2
+                """
+            ),
+        ),
+        (
+            (
+                "--index-url",
+                "https://test.pypi.org/simple/",
+                "commisery>=0.2,<1",
+            ),
+            dedent(
+                """\
+                pip:
+                  - from-index: https://test.pypi.org/simple/
+                    packages:
+                      - commisery>=0.2,<1
+                """
+            ),
         ),
         (
-            "--index-url",
-            "https://test.pypi.org/simple/",
-            "commisery>=0.2,<1",
+            ("flake8",),
+            dedent(
+                """\
+                pip: ["flake8"]
+                """
+            ),
         ),
-        ("flake8",),  # noqa: E201
     ),
+    ids=("extra-index", "from-index", "plain"),
 )
-def test_install_extensions_from_multiple_indices(monkeypatch, run_hopic, expected_args):
+def test_install_extensions_from_multiple_indices(monkeypatch, run_hopic, expected_args, config):
     def mock_check_call(args, *popenargs, **kwargs):
-        if "--user" in args:
-            args.remove("--user")
-        if "--verbose" in args:
-            args.remove("--verbose")
-        # del ['-c', constraints_file]
-        del args[4:6]
-
-        assert [*args] == [sys.executable, "-m", "pip", "install", *expected_args]
+        assert _pip_install_args(args) == [sys.executable, "-m", "pip", "install", *expected_args]
 
     monkeypatch.setattr(subprocess, "check_call", mock_check_call)
 
-    if expected_args[0] == "--extra-index-url":
-        config = dedent(
-            f"""\
-                pip:
-                  - with-extra-index:
-                      - {expected_args[1]}
-                    packages:
-                      - {expected_args[-1]}
-                """
-        )
-    elif expected_args[0] == "--index-url":
-        config = dedent(
-            f"""\
-                pip:
-                  - from-index: {expected_args[1]}
-                    packages:
-                      - {expected_args[-1]}
-                """
-        )
-    else:
-        assert not expected_args[0].startswith("-")
-        config = dedent(
-            f"""\
-                pip: {json.dumps(expected_args)}
-                """
-        )
     (result,) = run_hopic(
         ("install-extensions",),
         config=config,
@@ -107,14 +115,7 @@ def test_with_single_extra_index(monkeypatch, run_hopic):
     pkg = "hopic>=1.19<2"
 
     def mock_check_call(args, *popenargs, **kwargs):
-        if "--user" in args:
-            args.remove("--user")
-        if "--verbose" in args:
-            args.remove("--verbose")
-        # del ['-c', constraints_file]
-        del args[4:6]
-
-        assert [*args] == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, pkg]
+        assert _pip_install_args(args) == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, pkg]
 
     monkeypatch.setattr(subprocess, "check_call", mock_check_call)
 
@@ -137,17 +138,11 @@ def test_recursive_extension_installation(monkeypatch, run_hopic):
     extra_index = "https://test.pypi.org/simple/"
     pkg = "pipeline-template"
     template_pkg = "template-in-template"
-    expected_pkg_install_order = [pkg, template_pkg]
+    expected_pkg_install_order = deque((pkg, template_pkg))
     inner_template_called = []
 
     def mock_check_call(args, *popenargs, **kwargs):
-        if "--user" in args:
-            args.remove("--user")
-        if "--verbose" in args:
-            args.remove("--verbose")
-        del args[4:6]
-
-        assert [*args] == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, expected_pkg_install_order.pop(0)]
+        assert _pip_install_args(args) == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, expected_pkg_install_order.popleft()]
 
     monkeypatch.setattr(subprocess, "check_call", mock_check_call)
 
@@ -215,16 +210,10 @@ def test_recursive_extension_installation_invalid_template_name(monkeypatch, run
     extra_index = "https://test.pypi.org/simple/"
     pkg = "pipeline-template"
     template_pkg = "template-in-template"
-    expected_pkg_install_order = [pkg, template_pkg]
+    expected_pkg_install_order = deque((pkg, template_pkg))
 
     def mock_check_call(args, *popenargs, **kwargs):
-        if "--user" in args:
-            args.remove("--user")
-        if "--verbose" in args:
-            args.remove("--verbose")
-        del args[4:6]
-
-        assert [*args] == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, expected_pkg_install_order.pop(0)]
+        assert _pip_install_args(args) == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, expected_pkg_install_order.popleft()]
 
     monkeypatch.setattr(subprocess, "check_call", mock_check_call)
 
@@ -282,13 +271,7 @@ def test_config_as_extension(monkeypatch, run_hopic, pass_through_environment_va
     inner_template_called = []
 
     def mock_check_call(args, *popenargs, **kwargs):
-        if "--user" in args:
-            args.remove("--user")
-        if "--verbose" in args:
-            args.remove("--verbose")
-        del args[4:6]
-
-        assert [*args] == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, template_pkg]
+        assert _pip_install_args(args) == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, template_pkg]
 
     monkeypatch.setattr(subprocess, "check_call", mock_check_call)
 
@@ -368,13 +351,7 @@ def test_config_has_duplicated_keys(monkeypatch, run_hopic):
     inner_template_called = []
 
     def mock_check_call(args, *popenargs, **kwargs):
-        if "--user" in args:
-            args.remove("--user")
-        if "--verbose" in args:
-            args.remove("--verbose")
-        del args[4:6]
-
-        assert [*args] == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, template_pkg]
+        assert _pip_install_args(args) == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, template_pkg]
 
     monkeypatch.setattr(subprocess, "check_call", mock_check_call)
 
@@ -447,6 +424,7 @@ def test_invalid_template_name(run_hopic):
     assert any("No YAML template named 'xyzzy' available (props={})" in msg for _, msg in result.logs)
 
 
+@slow
 def test_recursive_extension_installation_version_functionality(monkeypatch, run_hopic):
     first_pkg = "firstorder"
     second_pkg = "secondorder"
@@ -620,16 +598,11 @@ def run_default_merge_flow(monkeypatch, run_hopic, config, pkg, message, target=
 def test_extension_installation_version_config(monkeypatch, run_hopic, merge_message, commit_message, expected_result_code):
     extra_index = "https://test.pypi.org/simple/"
     pkg = "pipeline-template"
-    expected_pkg_install_order = [pkg]
+    expected_pkg_install_order = deque((pkg,))
 
     def mock_check_call(args, *popenargs, **kwargs):
-        if "--user" in args:
-            args.remove("--user")
-        if "--verbose" in args:
-            args.remove("--verbose")
-        del args[4:6]
         if len(expected_pkg_install_order):
-            assert [*args] == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, expected_pkg_install_order.pop(0)]
+            assert _pip_install_args(args) == [sys.executable, "-m", "pip", "install", "--extra-index-url", extra_index, expected_pkg_install_order.popleft()]
 
     monkeypatch.setattr(subprocess, "check_call", mock_check_call)
 
@@ -676,11 +649,6 @@ def test_add_hopic_config_with_template_in_pr(capfd, monkeypatch, run_hopic):
     subprocess_call = subprocess.check_call
 
     def mock_check_call(args, *popenargs, **kwargs):
-        if "--user" in args:
-            args.remove("--user")
-        if "--verbose" in args:
-            args.remove("--verbose")
-        del args[4:6]
         if not all(arg in args for arg in ["pip", "install"]):
             subprocess_call(args)
 
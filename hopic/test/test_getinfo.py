@@ -12,13 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from collections import OrderedDict
 from collections.abc import Sequence
 from textwrap import dedent
-import json
 import os
 import stat
 
+import orjson
+import pytest
+
 
 def test_order(run_hopic):
     """
@@ -46,7 +47,7 @@ def test_order(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert tuple(output.keys()) == ('build', 'test', 'upload')
     assert tuple(output['build' ].keys()) == ('a', 'b')         # noqa: E202
@@ -80,7 +81,7 @@ def test_variants_without_metadata(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert 'build'  in output  # noqa: E272
     assert 'test'   in output  # noqa: E272
@@ -112,7 +113,7 @@ def test_with_credentials_format(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     with_credentials = output['build']['a']['with-credentials']
     assert isinstance(with_credentials, Sequence)
@@ -123,104 +124,83 @@ def test_with_credentials_format(run_hopic):
     assert 'fourth_id' in with_credentials[3]['id']
 
 
-def test_embed_variants_file(run_hopic):
-    generate_script_path = "generate-variants.py"
-    (result,) = run_hopic(
-        ("getinfo",),
-        config=dedent(
-            f'''\
-            phases:
-              build:
-                a: []
-
-              test: !embed
-                cmd: {generate_script_path}
-            '''
-        ),
-        files={
-            generate_script_path: (
-                dedent(
-                    '''\
-            #!/usr/bin/env python3
+_embed_script_path = "generate-variants.py"
 
-            print(\'\'\'test-variant:
-              - echo Bob the builder\'\'\')
-                    '''
-                ),
-                lambda fname: os.chmod(fname, os.stat(fname).st_mode | stat.S_IEXEC),
-            ),
-        },
-    )
 
-    assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+@pytest.fixture(scope="module")
+def embed_phases_config():
+    return dedent(
+        f'''\
+        phases:
+          build:
+            a: []
 
-    assert 'build' in output
-    assert 'a' in output['build']
-    assert 'test' in output
-    assert 'test-variant' in output['test']
+          test: !embed
+            cmd: {_embed_script_path}
+        '''
+    )
 
 
-def test_embed_variants_non_existing_file(run_hopic):
-    generate_script_path = "generate-variants.py"
-    (result,) = run_hopic(
-        ("getinfo",),
-        config=dedent(
-            f'''\
-            phases:
-              build:
-                a: []
+@pytest.fixture(
+    params=(
+        (
+            dedent(
+                '''\
+        #!/usr/bin/env python3
 
-              test: !embed
-                cmd: {generate_script_path}
-            '''
+        print(\'\'\'test-variant:
+          - echo Bob the builder\'\'\')
+                '''
+            ),
+            'test-variant',
         ),
-    )
+        (
+            dedent(
+                '''\
+        #!/usr/bin/env python3
+        print(\'\'\'test-variant:
+        error\'\'\')
+                '''
+            ),
+            'error-variant',
+        ),
+        (None, 'error-variant'),
+    ),
+    ids=("ok", "err", "missing"),
+)
+def embed_script(request):
+    """
+    Provides the files to add for the embedded script along with the variant that it's expected to produce.
+    """
 
-    assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    script, expected_variant = request.param
+    if script is None:
+        return None, expected_variant
 
-    assert 'build' in output
-    assert 'a' in output['build']
-    assert 'test' in output
-    assert 'error-variant' in output['test']
+    files = {
+        _embed_script_path: (
+            script,
+            lambda fname: os.chmod(fname, os.stat(fname).st_mode | stat.S_IEXEC),
+        ),
+    }
+    return files, expected_variant
 
 
-def test_embed_variants_error_in_file(run_hopic):
-    generate_script_path = "generate-variants.py"
+def test_embed_variants(run_hopic, embed_phases_config, embed_script):
+    files, expected_variant = embed_script
     (result,) = run_hopic(
         ("getinfo",),
-        config=dedent(
-            f'''\
-            phases:
-              build:
-                a: []
-
-              test: !embed
-                cmd: {generate_script_path}
-            '''
-        ),
-        files={
-            generate_script_path: (
-                dedent(
-                    '''\
-            #!/usr/bin/env python3
-            print(\'\'\'test-variant:
-            error\'\'\')
-                    '''
-                ),
-                lambda fname: os.chmod(fname, os.stat(fname).st_mode | stat.S_IEXEC),
-            ),
-        },
+        config=embed_phases_config,
+        files=files,
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert 'build' in output
     assert 'a' in output['build']
     assert 'test' in output
-    assert 'error-variant' in output['test']
+    assert expected_variant in output['test']
 
 
 def test_embed_variants_script_with_arguments(run_hopic):
@@ -252,7 +232,7 @@ def test_embed_variants_script_with_arguments(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert 'test' in output
     assert f'test-{generate_script_args}' in output['test']
@@ -274,7 +254,7 @@ def test_embed_variants_cmd(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert 'test' in output
     assert 'test-variant' in output['test']
@@ -303,7 +283,7 @@ def test_wait_on_full_previous_phase_dependency(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert 'wait-on-full-previous-phase' in output['y']['b']
     assert not output['y']['b']['wait-on-full-previous-phase']
@@ -325,7 +305,7 @@ def test_mark_nops(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert output["x"]["a"]["nop"] is True
     assert output["y"]["a"]["nop"] is True
@@ -352,7 +332,7 @@ def test_variant_timeout(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert output["x"]["a"]["timeout"] == 90
     assert "timeout" not in output["x"]["b"]
@@ -377,7 +357,7 @@ def test_post_submit_summed_timeout(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     assert output["timeout"] == 42 + 37
 
@@ -402,7 +382,7 @@ def test_finally_with_credentials_format(run_hopic):
     )
 
     assert result.exit_code == 0
-    output = json.loads(result.stdout, object_pairs_hook=OrderedDict)
+    output = orjson.loads(result.stdout_bytes)
 
     with_credentials = output["build"]["a"]["with-credentials"]
     assert isinstance(with_credentials, Sequence)
@@ -20,6 +20,9 @@
 import re
 import subprocess
 import sys
+from collections import deque
+from pathlib import Path
+from string import Template
 from textwrap import dedent
 
 import git
@@ -41,6 +44,122 @@
         author=_author,
         committer=_author,
     )
+_HOPIC_NOTE_RE = re.compile(
+        r'^Committed-by: Hopic.*\nWith Python version: .*\nAnd with these installed packages:\n.*\bhopic\b',
+        re.DOTALL | re.MULTILINE,
+    )
+_HOTFIX_ID_INVALID_RE = re.compile(r"Hotfix ID '.*?' is not a valid identifier", re.ASCII)
+_HOTFIX_ID_RESERVED_RE = re.compile(r"Hotfix ID '.*?' starts with reserved prefix", re.ASCII)
+_HOTFIX_ID_CONTAINS_VERSION_RE = re.compile(r"Hotfix ID 'awesomeness-(.*?)-something' is not allowed to contain the base version '\1'", re.ASCII)
+_HOTFIX_BREAKING_RE = re.compile(r"[Bb]reaking changes are not allowed [io]n hotfix", re.ASCII)
+_HOTFIX_FEATURE_RE = re.compile(r"[Nn]ew features are not allowed [io]n hotfix", re.ASCII)
+_BUMP_NO_CONFIG = b"version:\n  bump: no\n"
+_STRICT_HOTFIX_CONFIG = dedent(
+    """\
+    version:
+      tag: yes
+      format: semver
+      bump:
+        policy: conventional-commits
+        strict: yes
+      hotfix-branch: '^hotfix/\\d+\\.\\d+\\.\\d+-(?P<id>.*)$'
+    """
+).encode()
+
+
+def _commit(repo, message, files=None):
+    """
+    Creates a commit with deterministic metadata.
+
+    When given, the files (a mapping from path to text or bytes) get written and staged first, sharing a single index with the commit.
+    """
+    index = repo.index
+    if files:
+        for path, content in files.items():
+            path = Path(repo.working_tree_dir) / path
+            if isinstance(content, bytes):
+                path.write_bytes(content)
+            else:
+                path.write_text(content)
+        index.add(files.keys())
+    return index.commit(message=message, **_commitargs)
+
+
+def _rename_branch(repo, name):
+    """
+    Renames the currently checked out branch by writing its refs directly, instead of forking 'git branch --move'.
+    """
+    old = repo.head.reference
+    if old.name == name:
+        return
+    repo.head.reference = repo.create_head(name, old.commit)
+    git.SymbolicReference.delete(repo, old.path)
+
+
+def _fast_build_history(repo, commits):
+    """
+    Appends a linear series of commits to the currently checked out branch using a single 'git fast-import' process.
+
+    Every commit is described by a mapping with a 'message' and optionally 'files', a mapping from path to content.
+    Only the branch gets updated, the index and work tree are left alone.
+    Returns the last commit created.
+    """
+    signature = f"{_author.name} <{_author.email}> {_git_time}\n".encode()
+    stream = []
+    for idx, commit in enumerate(commits):
+        message = commit["message"].encode()
+        stream += [
+            f"commit {repo.head.reference.path}\n".encode(),
+            b"author " + signature,
+            b"committer " + signature,
+            f"data {len(message)}\n".encode(), message, b"\n",
+        ]
+        if idx == 0:
+            stream.append(f"from {repo.head.commit.hexsha}\n".encode())
+        for path, content in commit.get("files", {}).items():
+            content = content.encode()
+            stream += [f"M 100644 inline {path}\ndata {len(content)}\n".encode(), content, b"\n"]
+        stream.append(b"\n")
+
+    subprocess.run(("git", "fast-import", "--quiet"), input=b"".join(stream), cwd=repo.working_dir, check=True)
+    return repo.head.commit
+
+
+def _read_note(repo, commit, ref="hopic/master"):
+    """Reads a note through GitPython's persistent 'git cat-file --batch' process instead of forking 'git notes show'."""
+    notes = repo.commit(f"refs/notes/{ref}").tree
+    return notes[repo.commit(commit).hexsha].data_stream.read().decode()
+
+
+class _ExpectQueue(deque):
+    """A replacement for subprocess.check_call that expects to be called with the queued commands, in order."""
+
+    def __call__(self, args, *popenargs, **kwargs):
+        assert tuple(args) == self.popleft()
+
+
+def _tail_lines(out, skip):
+    """Splits the output after the first 'skip' lines on whitespace without copying those lines first."""
+    idx = 0
+    for _ in range(skip):
+        idx = out.find('\n', idx)
+        if idx < 0:
+            # Fewer lines than to skip
+            return []
+        idx += 1
+    return out[idx:].split()
+
+
+_AUTOSQUASH_BASE_CONFIG = dedent(
+    """\
+    version:
+      bump: no
+
+    phases:
+      build:
+        test:
+    """
+)
 
 
 @pytest.mark.parametrize("variable", (
@@ -50,64 +169,39 @@
     "SOURCE_COMMITS",
 ))
 def test_autosquash_base(capfd, run_hopic, variable):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with (run_hopic.toprepo / 'hopic-ci-config.yaml').open('w') as f:
-            f.write(
-                dedent(
-                    """\
-                    version:
-                      bump: no
-
-                    phases:
-                      build:
-                        test:
-                    """
-                )
-            )
-            if variable.endswith("S"):
-                f.write(
-                    dedent(
-                        f"""\
-                        #
-                              - sh: git log --format=%P ${{{variable}}}
-                        """
-                    )
-                )
-            else:
-                f.write(
-                    dedent(
-                        f"""\
-                        #
-                              - foreach: {variable}
-                                sh: git log -1 --format=%P ${{{variable}}}
-                        """
-                    )
-                )
-        repo.index.add(('hopic-ci-config.yaml',))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-
-        # Main branch moves on
-        with (run_hopic.toprepo / 'A.txt').open('w') as f:
-            f.write('A')
-        repo.index.add(('A.txt',))
-        final_commit = repo.index.commit(message='feat: add A', **_commitargs)
-
-        # PR branch from just before the main branch's HEAD
-        repo.head.reference = repo.create_head('something-useful', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    config = _AUTOSQUASH_BASE_CONFIG
+    if variable.endswith("S"):
+        config += dedent(
+            f"""\
+            #
+                  - sh: git log --format=%P ${{{variable}}}
+            """
+        )
+    else:
+        config += dedent(
+            f"""\
+            #
+                  - foreach: {variable}
+                    sh: git log -1 --format=%P ${{{variable}}}
+            """
+        )
 
-        # Some change
-        with (run_hopic.toprepo / 'something.txt').open('w') as f:
-            f.write('usable')
-        repo.index.add(('something.txt',))
-        repo.index.commit(message='feat: add something useful', **_commitargs)
+    repo = run_hopic.init_toprepo({'hopic-ci-config.yaml': config})
+    base_commit = repo.head.commit
 
+    # Main branch moves on
+    final_commit = _fast_build_history(repo, ({"message": "feat: add A", "files": {"A.txt": "A"}},))
+
+    # PR branch from just before the main branch's HEAD
+    repo.head.reference = repo.create_head('something-useful', base_commit)
+    assert not repo.head.is_detached
+
+    _fast_build_history(repo, (
+        # Some change
+        {"message": "feat: add something useful", "files": {"something.txt": "usable"}},
         # A fixup on top of that change
-        with (run_hopic.toprepo / 'something.txt').open('w') as f:
-            f.write('useful')
-        repo.index.add(('something.txt',))
-        repo.index.commit(message='fixup! feat: add something useful', **_commitargs)
+        {"message": "fixup! feat: add something useful", "files": {"something.txt": "useful"}},
+    ))
 
     # Successful checkout and build
     (*_, result) = run_hopic(
@@ -122,35 +216,36 @@ def test_autosquash_base(capfd, run_hopic, variable):
     sys.stdout.write(out)
     sys.stderr.write(err)
 
-    build_out = ''.join(out.splitlines(keepends=True)[2:])
-    commits = build_out.split()
+    commits = _tail_lines(out, 2)
     assert str(final_commit) not in commits
     assert str(base_commit) in commits
 
 
+@pytest.mark.parametrize("out", (
+    "",
+    "one",
+    "one\n",
+    "one\ntwo",
+    "one\ntwo\n",
+    "one\ntwo\nthree four\nfive",
+), ids=("empty", "unterminated-line", "single-line", "unterminated-second-line", "two-lines", "more-lines"))
+def test_tail_lines(out):
+    assert _tail_lines(out, 2) == "\n".join(out.splitlines()[2:]).split()
+
+
 def hopic_config_subdir_version_file_tester(capfd, config_dir, hopic_config, version_file, version_input, expected_version, run_hopic, expect_tag=True):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        if not os.path.exists(run_hopic.toprepo / config_dir):
-            os.mkdir(run_hopic.toprepo / config_dir)
-        with (run_hopic.toprepo / config_dir / 'hopic-ci-config.yaml').open('w') as f:
-            f.write(hopic_config)
-
-        with (run_hopic.toprepo / config_dir / version_file).open('w') as f:
-            f.write(version_input)
-        repo.index.add((os.path.join(config_dir, 'hopic-ci-config.yaml'),))
-        repo.index.add((os.path.join(config_dir, version_file),))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-
-        # PR branch from just before the main branch's HEAD
-        repo.head.reference = repo.create_head('something-useful', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    repo = run_hopic.init_toprepo({
+        os.path.join(config_dir, 'hopic-ci-config.yaml'): hopic_config,
+        os.path.join(config_dir, version_file): version_input,
+    })
+    base_commit = repo.head.commit
 
-        # Some change
-        with (run_hopic.toprepo / 'something.txt').open('w') as f:
-            f.write('usable')
-        repo.index.add(('something.txt',))
-        repo.index.commit(message='feat: add something useful', **_commitargs)
+    # PR branch from just before the main branch's HEAD
+    repo.head.reference = repo.create_head('something-useful', base_commit)
+    assert not repo.head.is_detached
+
+    # Some change
+    _commit(repo, 'feat: add something useful', {'something.txt': 'usable'})
 
     # Successful checkout and build
     (*_, result) = run_hopic(
@@ -167,33 +262,37 @@ def hopic_config_subdir_version_file_tester(capfd, config_dir, hopic_config, ver
     sys.stderr.write(err)
     _, merge_commit, version_out, *_ = out.splitlines()
     assert version_out == expected_version
-    with git.Repo(run_hopic.toprepo, expand_vars=False) as repo:
-        repo.git.checkout('master')
-        if expect_tag:
-            assert repo.git.tag(l=True) == expected_version
+    repo.git.checkout('master')
+    if expect_tag:
+        assert [tag.name for tag in repo.tags] == [expected_version]
 
-        note = repo.git.notes('show', merge_commit, ref='hopic/master')
-        assert re.match(
-                r'^Committed-by: Hopic.*\nWith Python version: .*\nAnd with these installed packages:\n.*\bhopic\b',
-                note, flags=re.DOTALL | re.MULTILINE,
-            )
+    note = _read_note(repo, merge_commit)
+    assert _HOPIC_NOTE_RE.match(note)
 
     return run_hopic.toprepo
 
 
+_VERSION_FILE = "revision_test.txt"
+_VERSION_FILE_CONFIG = f"""\
+version:
+  file: {_VERSION_FILE}
+  tag:  true
+  bump: patch
+  format: semver"""
+_VERSION_FILE_AFTER_SUBMIT_CONFIG = _VERSION_FILE_CONFIG + """
+  after-submit:
+    bump: prerelease
+    prerelease-seed: PRERELEASE-TEST"""
+
+
 def test_hopic_config_subdir_version_file(capfd, run_hopic):
     version = "0.0.1-SNAPSHOT"
     commit_version = "0.0.1"
-    version_file = "revision_test.txt"
+    version_file = _VERSION_FILE
     config_dir = "test_config"
     hopic_config_subdir_version_file_tester(capfd,
                                             config_dir,
-                                            f"""\
-version:
-  file: {version_file}
-  tag:  true
-  bump: patch
-  format: semver""",
+                                            _VERSION_FILE_CONFIG,
                                             version_file,
                                             f"""\
 version={version}""",
@@ -204,57 +303,39 @@ def test_hopic_config_subdir_version_file(capfd, run_hopic):
 def test_hopic_config_subdir_version_file_after_submit(capfd, run_hopic):
     version = "0.0.42-SNAPSHOT"
     commit_version = "0.0.42"
-    version_file = "revision_test.txt"
+    version_file = _VERSION_FILE
     config_dir = ".ci"
     test_repo = hopic_config_subdir_version_file_tester(capfd,
                                                         config_dir,
-                                                        f"""\
-version:
-  file: {version_file}
-  tag:  true
-  bump: patch
-  format: semver
-  after-submit:
-    bump: prerelease
-    prerelease-seed: PRERELEASE-TEST""",
+                                                        _VERSION_FILE_AFTER_SUBMIT_CONFIG,
                                                         version_file,
                                                         f"""\
 version={version}""",
                                                         commit_version,
                                                         run_hopic)
-    with (test_repo / config_dir / version_file).open('r') as f:
-        assert f.read() == "version=0.0.43-PRERELEASE-TEST"
+    assert (test_repo / config_dir / version_file).read_text() == "version=0.0.43-PRERELEASE-TEST"
 
 
 def test_version_bump_after_submit_from_repo_root_dir(capfd, run_hopic):
     version = "0.0.3-SNAPSHOT"
     commit_version = "0.0.3"
-    version_file = "revision_test.txt"
+    version_file = _VERSION_FILE
     config_dir = ""
     test_repo = hopic_config_subdir_version_file_tester(capfd,
                                                         config_dir,
-                                                        f"""\
-version:
-  file: {version_file}
-  tag:  true
-  bump: patch
-  format: semver
-  after-submit:
-    bump: prerelease
-    prerelease-seed: PRERELEASE-TEST""",
+                                                        _VERSION_FILE_AFTER_SUBMIT_CONFIG,
                                                         version_file,
                                                         f"""\
 version={version}""",
                                                         commit_version,
                                                         run_hopic)
-    with (test_repo / config_dir / version_file).open('r') as f:
-        assert f.read() == "version=0.0.4-PRERELEASE-TEST"
+    assert (test_repo / config_dir / version_file).read_text() == "version=0.0.4-PRERELEASE-TEST"
 
 
 def test_version_file_without_tag_and_bump(capfd, run_hopic):
     version = '1.2.3'
     expected_version = version
-    version_file = "revision_test.txt"
+    version_file = _VERSION_FILE
     config_dir = '.ci'
     hopic_config_subdir_version_file_tester(
         capfd,
@@ -274,43 +355,39 @@ def test_version_file_without_tag_and_bump(capfd, run_hopic):
     )
 
 
+_BASE_CONVENTIONAL_CONFIG = dedent(
+    """\
+    version:
+      format: semver
+      tag:    true
+      bump:
+        policy: conventional-commits
+    """
+)
+_STRICT_LINE = "    strict: yes\n"
+_NOT_ON_EVERY_CHANGE_LINE = "    on-every-change: no\n"
+
+
 def merge_conventional_bump(capfd, run_hopic, message, strict=False, on_every_change=True, target='master', merge_message=None):
     if merge_message is None:
         merge_message = message
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with (run_hopic.toprepo / 'hopic-ci-config.yaml').open('w') as f:
-            f.write('''\
-version:
-  format: semver
-  tag:    true
-  bump:
-    policy: conventional-commits
-''')
-            if strict:
-                f.write('    strict: yes\n')
-            if not on_every_change:
-                f.write('    on-every-change: no\n')
-        repo.index.add(('hopic-ci-config.yaml',))
-        repo.index.commit(message='Initial commit', **_commitargs)
-        repo.git.branch(target, move=True)
-        repo.create_tag('0.0.0')
-
-        # PR branch
-        repo.head.reference = repo.create_head('something-useful')
-        assert not repo.head.is_detached
+    config = _BASE_CONVENTIONAL_CONFIG + (_STRICT_LINE if strict else "") + ("" if on_every_change else _NOT_ON_EVERY_CHANGE_LINE)
+    repo = run_hopic.init_toprepo({'hopic-ci-config.yaml': config}, tag='0.0.0')
+    _rename_branch(repo, target)
 
-        # A preceding commit on this PR to detect whether we check more than the first commit's message in a PR
-        repo.index.commit(message='chore: some intermediate commit', **_commitargs)
-        print(repo.git.log(format='fuller', color=True, stat=True), file=sys.stderr)
+    # PR branch
+    repo.head.reference = repo.create_head('something-useful')
+    assert not repo.head.is_detached
 
+    _fast_build_history(repo, (
+        # A preceding commit on this PR to detect whether we check more than the first commit's message in a PR
+        {"message": "chore: some intermediate commit"},
         # Some change
-        with (run_hopic.toprepo / 'something.txt').open('w') as f:
-            f.write('usable')
-        repo.index.add(('something.txt',))
-        repo.index.commit(message=message, **_commitargs)
-
+        {"message": message, "files": {"something.txt": "usable"}},
         # A succeeding commit on this PR to detect whether we check more than the last commit's message in a PR
-        repo.index.commit(message='chore: some other intermediate commit', **_commitargs)
+        {"message": "chore: some other intermediate commit"},
+    ))
+    if os.environ.get('HOPIC_TEST_VERBOSE'):
         print(repo.git.log(format='fuller', color=True, stat=True), file=sys.stderr)
 
     # Successful checkout and build
@@ -326,80 +403,35 @@ def merge_conventional_bump(capfd, run_hopic, message, strict=False, on_every_ch
     return result
 
 
-def test_merge_conventional_refactor_no_bump(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='refactor: some problem')
-    assert result.exit_code == 0
-
-    out, err = capfd.readouterr()
-    sys.stdout.write(out)
-    sys.stderr.write(err)
-
-    checkout_commit, merge_commit, merge_version = out.splitlines()
-    assert merge_version.startswith('0.0.1-'), "post merge version should be a pre-release of 0.0.1, not 0.0.1 itself"
-
-
-def test_merge_conventional_fix_bump(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='fix: some problem')
-    assert result.exit_code == 0
-
-    out, err = capfd.readouterr()
-    sys.stdout.write(out)
-    sys.stderr.write(err)
-
-    checkout_commit, merge_commit, merge_version = out.splitlines()
-    assert merge_version.startswith('0.0.1+g')
-
-
-def test_merge_conventional_feat_bump(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='feat: add something useful')
-    assert result.exit_code == 0
-
-    out, err = capfd.readouterr()
-    sys.stdout.write(out)
-    sys.stderr.write(err)
-
-    checkout_commit, merge_commit, merge_version = out.splitlines()
-    assert merge_version.startswith('0.1.0+g')
-
-
-def test_merge_conventional_breaking_change_bump(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='refactor!: make the API type better')
-    assert result.exit_code == 0
-
-    out, err = capfd.readouterr()
-    sys.stdout.write(out)
-    sys.stderr.write(err)
-
-    checkout_commit, merge_commit, merge_version = out.splitlines()
-    assert merge_version.startswith('1.0.0+g')
-
-
-def test_merge_conventional_feat_with_breaking_bump(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='''\
-refactor!: add something awesome
-
-This adds the new awesome feature.
-
-BREAKING CHANGE: unfortunately this was incompatible with the old feature for
-the same purpose, so you'll have to migrate.
-''')
-    assert result.exit_code == 0
-
-    out, err = capfd.readouterr()
-    sys.stdout.write(out)
-    sys.stderr.write(err)
-
-    checkout_commit, merge_commit, merge_version = out.splitlines()
-    assert merge_version.startswith('1.0.0+g')
-
-
-def test_merge_conventional_broken_feat(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='feat add something useful', strict=True)
-    assert result.exit_code != 0
-
-
-def test_merge_conventional_feat_bump_not_on_change(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='feat: add something useful', on_every_change=False)
+@pytest.mark.parametrize("message, strict, on_every_change, expected_prefix", (
+    ('refactor: some problem'             , False, True , '0.0.1-'),
+    ('fix: some problem'                  , False, True , '0.0.1+g'),
+    ('feat: add something useful'         , False, True , '0.1.0+g'),
+    ('refactor!: make the API type better', False, True , '1.0.0+g'),
+    (dedent('''\
+        refactor!: add something awesome
+
+        This adds the new awesome feature.
+
+        BREAKING CHANGE: unfortunately this was incompatible with the old feature for
+        the same purpose, so you'll have to migrate.
+        '''),                               False, True , '1.0.0+g'),
+    ('feat add something useful'          , True , True , None),
+    ('feat: add something useful'         , False, False, '0.0.1-4+g'),
+), ids=(
+    "refactor-no-bump",
+    "fix-bump",
+    "feat-bump",
+    "breaking-change-bump",
+    "feat-with-breaking-bump",
+    "broken-feat",
+    "feat-bump-not-on-change",
+))
+def test_merge_conventional(capfd, run_hopic, message, strict, on_every_change, expected_prefix):
+    result = merge_conventional_bump(capfd, run_hopic, message=message, strict=strict, on_every_change=on_every_change)
+    if expected_prefix is None:
+        assert result.exit_code != 0
+        return
     assert result.exit_code == 0
 
     out, err = capfd.readouterr()
@@ -407,28 +439,54 @@ def test_merge_conventional_feat_bump_not_on_change(capfd, run_hopic):
     sys.stderr.write(err)
 
     checkout_commit, merge_commit, merge_version = out.splitlines()
-    assert merge_version.startswith('0.0.1-4+g')
+    assert merge_version.startswith(expected_prefix), f"post merge version should start with {expected_prefix!r}, not be {merge_version!r}"
 
 
-def test_merge_conventional_breaking_change_on_major_branch(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='refactor!: make the API type better', target='release/42')
+@pytest.mark.parametrize("message, target, error", (
+    ('refactor!: make the API type better', 'release/42'   , 'Breaking changes are not allowed'),
+    ('feat: add something useful'         , 'release/42.21', 'New features are not allowed'),
+), ids=(
+    "breaking-change-on-major-branch",
+    "feat-on-minor-branch",
+))
+def test_merge_conventional_on_release_branch(capfd, run_hopic, message, target, error):
+    result = merge_conventional_bump(capfd, run_hopic, message=message, target=target)
     assert result.exception is not None
     if not isinstance(result.exception, VersioningError):
         raise result.exception
     err = result.exception.format_message()
-    assert 'Breaking changes are not allowed' in err
+    assert error in err
 
 
-def test_merge_conventional_feat_on_minor_branch(capfd, run_hopic):
-    result = merge_conventional_bump(capfd, run_hopic, message='feat: add something useful', target='release/42.21')
-    assert result.exception is not None
-    if not isinstance(result.exception, VersioningError):
-        raise result.exception
-    err = result.exception.format_message()
-    assert 'New features are not allowed' in err
+@pytest.fixture(scope="session")
+def session_subrepo(tmp_path_factory):
+    """A repository, to be used as submodule, that's shared by all tests because it's never modified."""
+    subrepo = tmp_path_factory.mktemp("subrepo")
+    with git.Repo.init(str(subrepo), expand_vars=False) as repo:
+        (subrepo / 'dummy.txt').write_text('Lalalala!\n')
+        repo.index.add(('dummy.txt',))
+        _commit(repo, 'Initial dummy commit')
+    return subrepo
 
 
-def test_move_submodule(capfd, monkeypatch, run_hopic, tmp_path):
+_SUBMODULE_BUILD_CONFIG = dedent(
+    """\
+    version:
+      bump: no
+
+    phases:
+      build:
+        test:
+          - cat subrepo_test/dummy.txt
+    """
+).encode()
+
+
+@pytest.mark.parametrize("cloned", (
+    False,
+    True,
+), ids=("gitlink", "cloned"))
+def test_move_submodule(capfd, monkeypatch, run_hopic, session_subrepo, cloned):
     old_subcommand_getter = git.cmd.Git.__getattr__
 
     def new_subcommand_getter(self, name: str):
@@ -438,38 +496,35 @@ def new_subcommand_getter(self, name: str):
 
     monkeypatch.setattr("git.cmd.Git.__getattr__", new_subcommand_getter)
 
-    subrepo = tmp_path / 'subrepo'
-    with git.Repo.init(str(subrepo), expand_vars=False) as repo:
-        with (subrepo / 'dummy.txt').open('w') as f:
-            f.write('Lalalala!\n')
-        repo.index.add(('dummy.txt',))
-        repo.index.commit(message='Initial dummy commit', **_commitargs)
-
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with (run_hopic.toprepo / 'hopic-ci-config.yaml').open('w') as f:
-            f.write('''\
-version:
-  bump: no
-
-phases:
-  build:
-    test:
-      - cat subrepo_test/dummy.txt
-''')
-        repo.index.add(('hopic-ci-config.yaml',))
-        repo.git.submodule(('add', subrepo, 'subrepo_test'))
-        repo.index.add(('.gitmodules',))
-        repo.index.commit(message='Initial commit', **_commitargs)
-
-        # Move submodule
-        repo.create_head("move_submodule_branch")
-        repo.git.checkout("move_submodule_branch")
-        repo.index.remove(["subrepo_test"])
-        with (run_hopic.toprepo / ".gitmodules").open("r+") as f:
-            f.truncate(0)
-
-        repo.git.submodule(("add", subrepo, "moved_subrepo"))
-        repo.index.commit(message="Move submodule", **_commitargs)
+    subrepo = session_subrepo
+    with git.Repo(subrepo, expand_vars=False) as repo:
+        subrepo_commit = repo.head.commit
+
+    def add_submodule(repo, path, *also_add):
+        if cloned:
+            (run_hopic.toprepo / ".gitmodules").write_text("")
+            repo.git.submodule(("add", str(subrepo), path))
+            repo.index.add((*also_add, ".gitmodules"))
+            return
+
+        # Equivalent to 'git submodule add' without cloning the submodule into the work tree
+        (run_hopic.toprepo / ".gitmodules").write_text(dedent(f"""\
+            [submodule "{path}"]
+            \tpath = {path}
+            \turl = {subrepo}
+            """))
+        repo.index.add((*also_add, ".gitmodules", git.BaseIndexEntry((0o160000, subrepo_commit.binsha, 0, path))))
+
+    repo = run_hopic.init_toprepo()
+    (run_hopic.toprepo / 'hopic-ci-config.yaml').write_bytes(_SUBMODULE_BUILD_CONFIG)
+    add_submodule(repo, 'subrepo_test', 'hopic-ci-config.yaml')
+    _commit(repo, 'Initial commit')
+
+    # Move submodule
+    repo.head.reference = repo.create_head("move_submodule_branch")
+    repo.index.remove(["subrepo_test"])
+    add_submodule(repo, "moved_subrepo")
+    _commit(repo, "Move submodule")
 
     (result,) = run_hopic(('--workspace', run_hopic.toprepo, 'checkout-source-tree', '--target-remote', run_hopic.toprepo, '--target-ref', 'master'))
     assert result.exit_code == 0
@@ -490,39 +545,32 @@ def new_subcommand_getter(self, name: str):
     assert not (run_hopic.toprepo / 'moved_subrepo' / 'dummy.txt').is_file()
 
 
-def test_modality_merge_has_all_parents(run_hopic, monkeypatch):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with open(run_hopic.toprepo / 'hopic-ci-config.yaml', 'w') as f:
-            f.write(dedent('''\
-                version:
-                  bump: no
+_AUTO_MERGE_CONFIG = dedent('''\
+    version:
+      bump: no
 
-                modality-source-preparation:
-                  AUTO_MERGE:
-                    - git fetch origin release/0
-                    - sh: git merge --no-commit --no-ff FETCH_HEAD
-                      changed-files: []
-                      commit-message: "Merge branch 'release/0'"
-                '''))
-        repo.index.add(('hopic-ci-config.yaml',))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
+    modality-source-preparation:
+      AUTO_MERGE:
+        - git fetch origin release/0
+        - sh: git merge --no-commit --no-ff FETCH_HEAD
+          changed-files: []
+          commit-message: "Merge branch 'release/0'"
+    ''')
 
-        # Main branch moves on
-        with (run_hopic.toprepo / 'A.txt').open('w') as f:
-            f.write('A')
-        repo.index.add(('A.txt',))
-        final_commit = repo.index.commit(message='feat: add A', **_commitargs)
 
-        # release branch from just before the main branch's HEAD
-        repo.head.reference = repo.create_head('release/0', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+def test_modality_merge_has_all_parents(run_hopic, monkeypatch):
+    repo = run_hopic.init_toprepo({'hopic-ci-config.yaml': _AUTO_MERGE_CONFIG})
+    base_commit = repo.head.commit
 
-        # Some change
-        with open(run_hopic.toprepo / 'something.txt', 'w') as f:
-            f.write('usable')
-        repo.index.add(('something.txt',))
-        merge_commit = repo.index.commit(message='feat: add something useful', **_commitargs)
+    # Main branch moves on
+    final_commit = _fast_build_history(repo, ({"message": "feat: add A", "files": {"A.txt": "A"}},))
+
+    # release branch from just before the main branch's HEAD
+    repo.head.reference = repo.create_head('release/0', base_commit)
+    assert not repo.head.is_detached
+
+    # Some change
+    merge_commit = _fast_build_history(repo, ({"message": "feat: add something useful", "files": {"something.txt": "usable"}},))
 
     monkeypatch.setenv('GIT_COMMITTER_NAME' , 'My Name is Nobody')
     monkeypatch.setenv('GIT_COMMITTER_EMAIL', 'nobody@example.com')
@@ -538,14 +586,10 @@ def test_modality_merge_has_all_parents(run_hopic, monkeypatch):
         )
     assert result.exit_code == 0
 
-    with git.Repo(run_hopic.toprepo, expand_vars=False) as repo:
-        assert repo.heads.master.commit.parents == (final_commit, merge_commit), f"Produced commit {repo.heads.master.commit} is not a merge commit"
+    assert repo.heads.master.commit.parents == (final_commit, merge_commit), f"Produced commit {repo.heads.master.commit} is not a merge commit"
 
-        note = repo.git.notes('show', 'master', ref='hopic/master')
-        assert re.match(
-                r'^Committed-by: Hopic.*\nWith Python version: .*\nAnd with these installed packages:\n.*\bhopic\b',
-                note, flags=re.DOTALL | re.MULTILINE,
-            )
+    note = _read_note(repo, 'master')
+    assert _HOPIC_NOTE_RE.match(note)
 
 
 @pytest.mark.parametrize(
@@ -556,51 +600,40 @@ def test_modality_merge_has_all_parents(run_hopic, monkeypatch):
     ),
 )
 def test_modality_merge_commit_message(expected_version, msg_prefix, run_hopic, monkeypatch):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
-            dedent(
-                f"""\
-                version:
-                  format: semver
-                  tag: true
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
-                    on-every-change: {json.dumps(expected_version is not None)}
-
-                pass-through-environment-vars:
-                  - CUSTOM_VAR
-
-                modality-source-preparation:
-                  AUTO_MERGE:
-                    - git fetch origin release/0
-                    - sh: git merge --no-commit --no-ff FETCH_HEAD
-                      changed-files: []
-                      commit-message: "{msg_prefix} branch 'release/0': $CUSTOM_VAR"
-                """
-            )
-        )
-
-        repo.index.add(('hopic-ci-config.yaml',))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-        repo.create_tag('0.0.0')
+    repo = run_hopic.init_toprepo({
+        "hopic-ci-config.yaml": dedent(
+            f"""\
+            version:
+              format: semver
+              tag: true
+              bump:
+                policy: conventional-commits
+                strict: yes
+                on-every-change: {json.dumps(expected_version is not None)}
+
+            pass-through-environment-vars:
+              - CUSTOM_VAR
+
+            modality-source-preparation:
+              AUTO_MERGE:
+                - git fetch origin release/0
+                - sh: git merge --no-commit --no-ff FETCH_HEAD
+                  changed-files: []
+                  commit-message: "{msg_prefix} branch 'release/0': $CUSTOM_VAR"
+            """
+        ),
+    }, tag='0.0.0')
+    base_commit = repo.head.commit
 
-        # Main branch moves on
-        with (run_hopic.toprepo / 'A.txt').open('w') as f:
-            f.write('A')
-        repo.index.add(('A.txt',))
-        repo.index.commit(message='feat: add A', **_commitargs)
+    # Main branch moves on
+    _fast_build_history(repo, ({"message": "feat: add A", "files": {"A.txt": "A"}},))
 
-        # release branch from just before the main branch's HEAD
-        repo.head.reference = repo.create_head('release/0', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    # release branch from just before the main branch's HEAD
+    repo.head.reference = repo.create_head('release/0', base_commit)
+    assert not repo.head.is_detached
 
-        # Some change
-        with open(run_hopic.toprepo / 'something.txt', 'w') as f:
-            f.write('usable')
-        repo.index.add(('something.txt',))
-        repo.index.commit(message='feat: add something useful', **_commitargs)
+    # Some change
+    _commit(repo, 'feat: add something useful', {'something.txt': 'usable'})
 
     monkeypatch.setattr(utils, "get_package_version", lambda package: "42.42.42")
     monkeypatch.setenv('GIT_COMMITTER_NAME' , 'My Name is Nobody')
@@ -618,17 +651,16 @@ def test_modality_merge_commit_message(expected_version, msg_prefix, run_hopic,
         )
 
     assert result.exit_code == 0
-    with git.Repo(run_hopic.toprepo, expand_vars=False) as repo:
-        if expected_version is not None:
-            assert repo.git.describe("master") == expected_version
+    if expected_version is not None:
+        assert repo.git.describe("master") == expected_version
 
-        assert repo.heads.master.commit.message == dedent(
-            f"""\
-                {msg_prefix} branch 'release/0': custom value
+    assert repo.heads.master.commit.message == dedent(
+        f"""\
+            {msg_prefix} branch 'release/0': custom value
 
-                Merged-by: Hopic 42.42.42
-            """
-        )
+            Merged-by: Hopic 42.42.42
+        """
+    )
 
 
 @pytest.mark.parametrize(
@@ -641,56 +673,47 @@ def test_modality_merge_commit_message(expected_version, msg_prefix, run_hopic,
     ),
 )
 def test_modality_merge_commit_message_dynamic(expected_version, msg_tag, run_hopic, monkeypatch):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
-            dedent(
-                """\
-                version:
-                  format: semver
-                  tag: true
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
-                    on-every-change: yes
-
-                project-name: test-project
-
-                modality-source-preparation:
-                  AUTO_MERGE:
-                    - git fetch origin release/0
-                    - sh: git merge --no-commit --no-ff FETCH_HEAD
-                      changed-files: []
-                      # Reuse merged commit's commit message tag for the produced merge commit
-                      commit-message-cmd:
-                        with-credentials:
-                          - id: topsecret
-                            type: username-password
-                            username-variable: MODALITY_AUTHOR
-                            password-variable: MODALITY_PASSWORD
-                        sh: >
-                          sh -c 'git show -q --format=%s MERGE_HEAD | sed "s|: .*|: merge branch '"'"'release/0'"'"'|" && echo && echo "Committed-by: ${MODALITY_AUTHOR}" && echo "Authorized-by: ${MODALITY_PASSWORD}"'
-                """
-            )
-        )
-
-        repo.index.add(("hopic-ci-config.yaml",))
-        base_commit = repo.index.commit(message="Initial commit", **_commitargs)
-        repo.create_tag("0.0.0")
+    repo = run_hopic.init_toprepo({
+        "hopic-ci-config.yaml": dedent(
+            """\
+            version:
+              format: semver
+              tag: true
+              bump:
+                policy: conventional-commits
+                strict: yes
+                on-every-change: yes
+
+            project-name: test-project
+
+            modality-source-preparation:
+              AUTO_MERGE:
+                - git fetch origin release/0
+                - sh: git merge --no-commit --no-ff FETCH_HEAD
+                  changed-files: []
+                  # Reuse merged commit's commit message tag for the produced merge commit
+                  commit-message-cmd:
+                    with-credentials:
+                      - id: topsecret
+                        type: username-password
+                        username-variable: MODALITY_AUTHOR
+                        password-variable: MODALITY_PASSWORD
+                    sh: >
+                      sh -c 'git show -q --format=%s MERGE_HEAD | sed "s|: .*|: merge branch '"'"'release/0'"'"'|" && echo && echo "Committed-by: ${MODALITY_AUTHOR}" && echo "Authorized-by: ${MODALITY_PASSWORD}"'
+            """
+        ),
+    }, tag="0.0.0")
+    base_commit = repo.head.commit
 
-        # Main branch moves on
-        (run_hopic.toprepo / "A.txt").write_text("A")
-        repo.index.add(("A.txt",))
-        repo.index.commit(message="feat: add A", **_commitargs)
+    # Main branch moves on
+    _fast_build_history(repo, ({"message": "feat: add A", "files": {"A.txt": "A"}},))
 
-        # release branch from just before the main branch's HEAD
-        repo.head.reference = repo.create_head("release/0", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    # release branch from just before the main branch's HEAD
+    repo.head.reference = repo.create_head("release/0", base_commit)
+    assert not repo.head.is_detached
 
-        # Some change
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message=f"{msg_tag}: add something useful", **_commitargs)
+    # Some change
+    _commit(repo, f"{msg_tag}: add something useful", {"something.txt": "usable"})
 
     username = "Master of the Universe"
     password = "Open Sesame!"
@@ -719,43 +742,41 @@ def get_credential_id(project_name_arg, cred_id):
     )
 
     assert result.exit_code == 0
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        if expected_version is not None:
-            assert repo.git.describe("master") == expected_version
+    if expected_version is not None:
+        assert repo.git.describe("master") == expected_version
 
-        assert repo.heads.master.commit.message == dedent(
-            f"""\
-                {msg_tag}: merge branch 'release/0'
+    assert repo.heads.master.commit.message == dedent(
+        f"""\
+            {msg_tag}: merge branch 'release/0'
 
-                Committed-by: {username}
-                Authorized-by: {password}
-                Merged-by: Hopic 42.42.42
-            """
-        )
+            Committed-by: {username}
+            Authorized-by: {password}
+            Merged-by: Hopic 42.42.42
+        """
+    )
 
 
 def test_modality_merge_nop(capfd, run_hopic, monkeypatch):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
-            dedent(
-                """\
-                    modality-source-preparation:
-                      AUTO_MERGE:
-                        - git fetch origin release/0
-                        - sh: git merge --no-commit --no-ff FETCH_HEAD
-                          changed-files: []
-                          commit-message: "Merge branch 'release/0'"
-                """
-            )
+    repo = run_hopic.init_toprepo()
+    (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
+        dedent(
+            """\
+                modality-source-preparation:
+                  AUTO_MERGE:
+                    - git fetch origin release/0
+                    - sh: git merge --no-commit --no-ff FETCH_HEAD
+                      changed-files: []
+                      commit-message: "Merge branch 'release/0'"
+            """
         )
+    )
 
-        repo.index.add(("hopic-ci-config.yaml",))
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
+    repo.index.add(("hopic-ci-config.yaml",))
+    base_commit = _commit(repo, "chore: initial commit")
 
-        # release branch from just before the main branch's HEAD, with nothing changed on it
-        repo.head.reference = repo.create_head("release/0", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    # release branch from just before the main branch's HEAD, with nothing changed on it
+    repo.head.reference = repo.create_head("release/0", base_commit)
+    assert not repo.head.is_detached
 
     monkeypatch.setenv("GIT_COMMITTER_NAME", "My Name is Nobody")
     monkeypatch.setenv("GIT_COMMITTER_EMAIL", "nobody@example.com")
@@ -794,63 +815,62 @@ def test_modality_with_credentials(run_hopic, monkeypatch):
     credential_id = "test_credentialId"
     project_name = "test-project"
 
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
-            dedent(
-                f"""\
-                    version:
-                      bump: no
-                    project-name: {project_name}
-                    modality-source-preparation:
-                      ALPHA:
-                        - with-credentials:
-                            id: {credential_id}
-                          sh: sh -c 'echo -n "$USERNAME:$PASSWORD" > creds.txt'
-                          changed-files:
-                            - creds.txt
-                          commit-message: "chore: embed secret"
-                """
-            )
+    repo = run_hopic.init_toprepo()
+    (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
+        dedent(
+            f"""\
+                version:
+                  bump: no
+                project-name: {project_name}
+                modality-source-preparation:
+                  ALPHA:
+                    - with-credentials:
+                        id: {credential_id}
+                      sh: sh -c 'echo -n "$USERNAME:$PASSWORD" > creds.txt'
+                      changed-files:
+                        - creds.txt
+                      commit-message: "chore: embed secret"
+            """
         )
-        repo.index.add(("hopic-ci-config.yaml",))
-        repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.git.branch("master", move=True)
+    )
+    repo.index.add(("hopic-ci-config.yaml",))
+    _commit(repo, "chore: initial commit")
 
-        # switch branch to allow 'master' to get updated
-        repo.head.reference = repo.create_head("something-useless")
-        assert not repo.head.is_detached
+    # switch branch to allow 'master' to get updated
+    repo.head.reference = repo.create_head("something-useless")
+    assert not repo.head.is_detached
 
-        def get_credential_id(project_name_arg, cred_id):
-            assert credential_id == cred_id
-            assert project_name == project_name_arg
-            return username, password
+    def get_credential_id(project_name_arg, cred_id):
+        assert credential_id == cred_id
+        assert project_name == project_name_arg
+        return username, password
 
-        monkeypatch.setattr(credentials, "get_credential_by_id", get_credential_id)
+    monkeypatch.setattr(credentials, "get_credential_by_id", get_credential_id)
 
-        (*_, result) = run_hopic(
-            command(
-                "checkout-source-tree",
-                target_remote=run_hopic.toprepo,
-                target_ref="master",
-            ),
-            command(
-                "prepare-source-tree",
-                author_date=f"@{_git_time}",
-                commit_date=f"@{_git_time}",
-                author_name=_author.name,
-                author_email=_author.email,
-            )
-            + command(
-                "apply-modality-change",
-                "ALPHA",
-            ),
-            command("submit"),
+    (*_, result) = run_hopic(
+        command(
+            "checkout-source-tree",
+            target_remote=run_hopic.toprepo,
+            target_ref="master",
+        ),
+        command(
+            "prepare-source-tree",
+            author_date=f"@{_git_time}",
+            commit_date=f"@{_git_time}",
+            author_name=_author.name,
+            author_email=_author.email,
         )
+        + command(
+            "apply-modality-change",
+            "ALPHA",
+        ),
+        command("submit"),
+    )
 
-        assert result.exit_code == 0
+    assert result.exit_code == 0
 
-        repo.head.reference = repo.branches["master"]
-        repo.head.reset(index=True, working_tree=True)
+    repo.head.reference = repo.branches["master"]
+    repo.head.reset(index=True, working_tree=True)
 
     creds_content = (run_hopic.toprepo / "creds.txt").read_text()
     assert creds_content == f"{username}:{password}"
@@ -863,27 +883,26 @@ def get_credential_id(project_name_arg, cred_id):
 def test_modality_version_bump(run_hopic, monkeypatch, modality_message, expected_version):
     monkeypatch.setenv('GIT_COMMITTER_NAME' , 'My Name is Nobody')
     monkeypatch.setenv('GIT_COMMITTER_EMAIL', 'nobody@example.com')
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with open(run_hopic.toprepo / 'hopic-ci-config.yaml', 'w') as f:
-            f.write(dedent(f"""\
-                version:
-                  format: semver
-                  tag: true
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
+    repo = run_hopic.init_toprepo()
+    (run_hopic.toprepo / 'hopic-ci-config.yaml').write_text(dedent(f"""\
+        version:
+          format: semver
+          tag: true
+          bump:
+            policy: conventional-commits
+            strict: yes
 
-                modality-source-preparation:
-                  INTAKE:
-                    - sh: touch test.txt
-                      changed-files: test.txt
-                      commit-message: "{modality_message}"
-                """))
+        modality-source-preparation:
+          INTAKE:
+            - sh: touch test.txt
+              changed-files: test.txt
+              commit-message: "{modality_message}"
+        """))
 
-        repo.index.add(('hopic-ci-config.yaml',))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-        repo.create_tag('0.0.0', message='first version')
-        repo.head.reference = repo.create_head('release/0', base_commit)
+    repo.index.add(('hopic-ci-config.yaml',))
+    base_commit = _commit(repo, 'Initial commit')
+    repo.create_tag('0.0.0', message='first version')
+    repo.head.reference = repo.create_head('release/0', base_commit)
 
     (*_, result) = run_hopic(
             ('checkout-source-tree', '--target-remote', run_hopic.toprepo, '--target-ref', 'master'),
@@ -896,33 +915,32 @@ def test_modality_version_bump(run_hopic, monkeypatch, modality_message, expecte
             ('submit', '--target-remote', run_hopic.toprepo)
         )
 
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        repo.git.checkout('master')
-        assert repo.git.describe().startswith(expected_version)
+    repo.git.checkout('master')
+    assert repo.git.describe().startswith(expected_version)
 
     assert result.exit_code == 0
 
 
 def test_modality_separate_changed_files(run_hopic, monkeypatch):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
-            dedent(
-                """\
-                version:
-                  bump: no
+    repo = run_hopic.init_toprepo()
+    (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
+        dedent(
+            """\
+            version:
+              bump: no
 
-                modality-source-preparation:
-                  ALPHA:
-                    - sh: touch test.txt
-                    - changed-files: test.txt
-                      commit-message: "chore: ensure file exists"
-                """
-            )
+            modality-source-preparation:
+              ALPHA:
+                - sh: touch test.txt
+                - changed-files: test.txt
+                  commit-message: "chore: ensure file exists"
+            """
         )
+    )
 
-        repo.index.add(("hopic-ci-config.yaml",))
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.head.reference = repo.create_head("release/0", base_commit)
+    repo.index.add(("hopic-ci-config.yaml",))
+    base_commit = _commit(repo, "chore: initial commit")
+    repo.head.reference = repo.create_head("release/0", base_commit)
 
     (*_, result) = run_hopic(
         command("checkout-source-tree", target_remote=run_hopic.toprepo, target_ref="master"),
@@ -939,7 +957,20 @@ def test_modality_separate_changed_files(run_hopic, monkeypatch):
         ),
     )
     assert result.exit_code == 0
-    assert re.match(r"^(?:[A-Fa-f0-9]{40}|[A-Fa-f0-9]{64})\n", result.stdout)
+    commit, _, _ = result.stdout.partition("\n")
+    assert len(commit) in (40, 64) and all(c in "0123456789abcdefABCDEF" for c in commit), f"{commit!r} is not a commit hash"
+
+
+_STRICT_CONVENTIONAL_CONFIG = Template(dedent(
+    """\
+    version:
+        format: semver
+        tag: true
+        bump:
+            policy: conventional-commits
+            strict: $strict
+    """
+))
 
 
 @pytest.mark.parametrize('strict, commit_message, merge_message, expected_result', (
@@ -951,32 +982,16 @@ def test_modality_separate_changed_files(run_hopic, monkeypatch):
 def test_merge_change_request_version_bump(capfd, monkeypatch, run_hopic, strict, commit_message, merge_message, expected_result):
     monkeypatch.setenv('GIT_COMMITTER_NAME' , 'My Name is Nobody')
     monkeypatch.setenv('GIT_COMMITTER_EMAIL', 'nobody@example.com')
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with (run_hopic.toprepo / 'hopic-ci-config.yaml').open('w') as f:
-            f.write(
-                dedent(f"""\
-                    version:
-                        format: semver
-                        tag: true
-                        bump:
-                            policy: conventional-commits
-                            strict: {strict}
-                """)
-            )
-        repo.index.add(('hopic-ci-config.yaml',))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-        repo.create_tag('0.0.0', message='first version')
-
-        # PR branch from just before the main branch's HEAD
-        repo.head.reference = repo.create_head('something-useful', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    repo = run_hopic.init_toprepo()
+    base_commit = _commit(repo, 'Initial commit', {'hopic-ci-config.yaml': _STRICT_CONVENTIONAL_CONFIG.substitute(strict=strict)})
+    repo.create_tag('0.0.0', message='first version')
 
-        # Some change
-        with (run_hopic.toprepo / 'something.txt').open('w') as f:
-            f.write('usable')
-        repo.index.add(('something.txt',))
-        repo.index.commit(message=commit_message, **_commitargs)
+    # PR branch from just before the main branch's HEAD
+    repo.head.reference = repo.create_head('something-useful', base_commit)
+    assert not repo.head.is_detached
+
+    # Some change
+    _commit(repo, commit_message, {'something.txt': 'usable'})
 
     # Successful checkout and build
     (*_, result) = run_hopic(
@@ -993,9 +1008,21 @@ def test_merge_change_request_version_bump(capfd, monkeypatch, run_hopic, strict
             raise result.exception
     else:
         assert result.exit_code == 0
-        with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-            repo.git.checkout('master')
-            assert repo.git.describe().startswith(expected_result['version'])
+        repo.git.checkout('master')
+        assert repo.git.describe().startswith(expected_result['version'])
+
+
+_CHANGE_MODALITY_CONFIG = dedent('''\
+    version:
+      bump: no
+
+    modality-source-preparation:
+      CHANGE:
+        - sh: touch new-file.txt
+          changed-files:
+            - new-file.txt
+          commit-message: Add new file
+    ''')
 
 
 def test_separate_modality_change(run_hopic):
@@ -1003,21 +1030,8 @@ def test_separate_modality_change(run_hopic):
 
     This will allow using this command locally by users and developers to make testing of those configs easier."""
 
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with open(run_hopic.toprepo / 'hopic-ci-config.yaml', 'w') as f:
-            f.write(dedent('''\
-                version:
-                  bump: no
-
-                modality-source-preparation:
-                  CHANGE:
-                    - sh: touch new-file.txt
-                      changed-files:
-                        - new-file.txt
-                      commit-message: Add new file
-                '''))
-        repo.index.add(('hopic-ci-config.yaml',))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
+    repo = run_hopic.init_toprepo()
+    base_commit = _commit(repo, 'Initial commit', {'hopic-ci-config.yaml': _CHANGE_MODALITY_CONFIG})
 
     (result,) = run_hopic(
             ('--workspace', run_hopic.toprepo,
@@ -1030,92 +1044,89 @@ def test_separate_modality_change(run_hopic):
         )
     assert result.exit_code == 0
 
-    with git.Repo(run_hopic.toprepo, expand_vars=False) as repo:
-        assert repo.head.commit != base_commit
-        assert repo.head.commit.parents == (base_commit,)
+    assert repo.head.commit != base_commit
+    assert repo.head.commit.parents == (base_commit,)
 
 
 def test_bundle_prepare_source_tree(run_hopic, tmp_path):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        src = run_hopic.toprepo / "widget.h"
-        src.write_text(
-            dedent(
-                """\
-                    #pragma once
-                    extern int sqrt(int);
-                """
-            )
+    repo = run_hopic.init_toprepo()
+    src = run_hopic.toprepo / "widget.h"
+    src.write_text(
+        dedent(
+            """\
+                #pragma once
+                extern int sqrt(int);
+            """
         )
+    )
+
+    repo.index.add(("widget.h",))
+    _commit(repo, "chore: initial commit")
+    repo.create_tag("1.0.0")
+
+    with src.open("a") as f:
+        f.write("extern float sqrt(float);\n")
+
+    repo.index.add(("widget.h",))
+    _commit(repo, "feat: support float too")
+    repo.create_tag("1.1.0")
+    repo.git.branch("data")
+
+    # throw away HEAD to allow creating a new "initial commit" for Hopic config repo
+    repo.git.update_ref(d="HEAD")
+    repo.head.reset(index=True, working_tree=True)
 
-        repo.index.add(("widget.h",))
-        repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.create_tag("1.0.0")
-
-        with src.open("a") as f:
-            f.write("extern float sqrt(float);\n")
-
-        repo.index.add(("widget.h",))
-        repo.index.commit(message="feat: support float too", **_commitargs)
-        repo.create_tag("1.1.0")
-        repo.git.branch("data")
-
-        # throw away HEAD to allow creating a new "initial commit" for Hopic config repo
-        repo.git.update_ref(d="HEAD")
-        repo.head.reset(index=True, working_tree=True)
-
-        hopic_cfg = run_hopic.toprepo / "hopic-ci-config.yaml"
-        hopic_cfg.write_text(
-            dedent(
-                """\
-                    version:
-                      file: version.txt
-                      tag:  true
-                      bump: minor
-                      format: semver
-                      after-submit:
-                        bump: prerelease
-                        prerelease-seed: SNAPSHOT
-
-                    scm:
-                      git:
-                        worktrees:
-                          output/folder: data
-                        ref: 1.0.0
-                    phases:
-                      a:
-                        x:
-                          - worktrees:
-                              output/folder:
-                                commit-message: "Update documentation for ${VERSION}"
-                            sh: ":"
-                """
-            )
+    hopic_cfg = run_hopic.toprepo / "hopic-ci-config.yaml"
+    hopic_cfg.write_text(
+        dedent(
+            """\
+                version:
+                  file: version.txt
+                  tag:  true
+                  bump: minor
+                  format: semver
+                  after-submit:
+                    bump: prerelease
+                    prerelease-seed: SNAPSHOT
+
+                scm:
+                  git:
+                    worktrees:
+                      output/folder: data
+                    ref: 1.0.0
+                phases:
+                  a:
+                    x:
+                      - worktrees:
+                          output/folder:
+                            commit-message: "Update documentation for ${VERSION}"
+                        sh: ":"
+            """
         )
-        (run_hopic.toprepo / "version.txt").write_text(
-            dedent(
-                """\
-                blabla
-                version=1.0.0
-                mooh
-                """
-            )
+    )
+    (run_hopic.toprepo / "version.txt").write_text(
+        dedent(
+            """\
+            blabla
+            version=1.0.0
+            mooh
+            """
         )
-        repo.index.add(("hopic-ci-config.yaml", "version.txt"))
-        repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.git.branch("master", move=True)
+    )
+    repo.index.add(("hopic-ci-config.yaml", "version.txt"))
+    _commit(repo, "chore: initial commit")
 
-        # PR branch
-        repo.head.reference = repo.create_head("something-useful")
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    # PR branch
+    repo.head.reference = repo.create_head("something-useful")
+    assert not repo.head.is_detached
 
-        # Some change
-        hopic_cfg.write_text(hopic_cfg.read_text().replace("1.0.0", "1.1.0"))
-        repo.index.add(("hopic-ci-config.yaml",))
-        repo.index.commit(message="feat: get new float widget", **_commitargs)
+    # Some change
+    hopic_cfg.write_text(hopic_cfg.read_text().replace("1.0.0", "1.1.0"))
+    repo.index.add(("hopic-ci-config.yaml",))
+    _commit(repo, "feat: get new float widget")
 
-        # A fixup on top of that change
-        repo.index.commit(message="fixup! feat: get new float widget", **_commitargs)
+    # A fixup on top of that change
+    _commit(repo, "fixup! feat: get new float widget")
 
     transfer_bundle = tmp_path / "transfer.bundle"
     orig_rundir = tmp_path / "rundir-orig"
@@ -1175,55 +1186,40 @@ def test_bundle_prepare_source_tree(run_hopic, tmp_path):
     ('new-version-only', 'feat: something', '0.1.0'  , True ),
 ))
 def test_run_on_change(monkeypatch, run_hopic, run_on_change, commit_message, expected_version, expect_publish):
-    expected = [
+    expected = _ExpectQueue((
         ('echo', 'build-a', expected_version),
-    ]
+    ))
     if expect_publish:
         expected.append(('echo', 'publish-a', expected_version))
 
-    def mock_check_call(args, *popenargs, **kwargs):
-        assert tuple(args) == expected.pop(0)
-
-    monkeypatch.setattr(subprocess, 'check_call', mock_check_call)
-
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        cfg_file = 'hopic-ci-config.yaml'
-
-        with (run_hopic.toprepo / cfg_file).open('w') as f:
-            f.write(dedent(f"""\
-                    version:
-                      format: semver
-                      tag:    true
-                      bump:
-                        policy: conventional-commits
-
-                    phases:
-                      build:
-                        a:
-                          - echo build-a ${{PURE_VERSION}}
-
-                      publish:
-                        a:
-                          - run-on-change: {run_on_change}
-                          - echo publish-a ${{PURE_VERSION}}
-                    """))
-
-        repo.index.add((cfg_file,))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-        repo.git.branch('master', move=True)
-        repo.create_tag('0.0.0')
-
-        # PR branch
-        repo.head.reference = repo.create_head('something-useful', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    monkeypatch.setattr(subprocess, 'check_call', expected)
 
-        # Some change
-        if commit_message is not None:
-            with (run_hopic.toprepo / 'something.txt').open('w') as f:
-                f.write('usable')
-            repo.index.add(('something.txt',))
-            repo.index.commit(message=commit_message, **_commitargs)
+    repo = run_hopic.init_toprepo({'hopic-ci-config.yaml': dedent(f"""\
+            version:
+              format: semver
+              tag:    true
+              bump:
+                policy: conventional-commits
+
+            phases:
+              build:
+                a:
+                  - echo build-a ${{PURE_VERSION}}
+
+              publish:
+                a:
+                  - run-on-change: {run_on_change}
+                  - echo publish-a ${{PURE_VERSION}}
+            """)}, tag='0.0.0')
+    base_commit = repo.head.commit
+
+    # PR branch
+    repo.head.reference = repo.create_head('something-useful', base_commit)
+    assert not repo.head.is_detached
+
+    # Some change
+    if commit_message is not None:
+        _commit(repo, commit_message, {'something.txt': 'usable'})
 
     # Successful checkout and build
     cmds = (
@@ -1244,6 +1240,24 @@ def mock_check_call(args, *popenargs, **kwargs):
     assert not expected
 
 
+_PUBLISH_VERSION_CONFIG = Template(dedent(
+    """\
+    version:
+      format: semver
+      tag:    true
+      bump:
+        policy: conventional-commits
+    $build
+
+    phases:
+      build:
+        a:
+          - echo build-a $${PURE_VERSION}
+          - echo build-a $${PUBLISH_VERSION}
+    """
+))
+
+
 @pytest.mark.parametrize('init_version, submittable_version, version_build', (
     ('0.0.0', False, None    ),
     ('0.0.0', True , None    ),
@@ -1251,34 +1265,15 @@ def mock_check_call(args, *popenargs, **kwargs):
     ('0.0.0', True , '1.70.0'),
 ))
 def test_run_publish_version(monkeypatch, run_hopic, init_version, submittable_version, version_build):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        cfg_file = 'hopic-ci-config.yaml'
-
-        with (run_hopic.toprepo / cfg_file).open('w') as f:
-            f.write(dedent(f"""\
-                    version:
-                      format: semver
-                      tag:    true
-                      bump:
-                        policy: conventional-commits
-                    {('  build: ' + version_build) if version_build else ''}
-
-                    phases:
-                      build:
-                        a:
-                          - echo build-a ${{PURE_VERSION}}
-                          - echo build-a ${{PUBLISH_VERSION}}
-                    """))
-
-        repo.index.add((cfg_file,))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-        repo.git.branch('master', move=True)
-        repo.create_tag(init_version)
-
-        # PR branch
-        repo.head.reference = repo.create_head('something-useful', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    repo = run_hopic.init_toprepo()
+    base_commit = _commit(repo, 'Initial commit', {
+        'hopic-ci-config.yaml': _PUBLISH_VERSION_CONFIG.substitute(build=f"  build: {version_build}" if version_build else ""),
+    })
+    repo.create_tag(init_version)
+
+    # PR branch
+    repo.head.reference = repo.create_head('something-useful', base_commit)
+    assert not repo.head.is_detached
 
     expected_publish_version = init_version
     if not submittable_version:
@@ -1286,15 +1281,12 @@ def test_run_publish_version(monkeypatch, run_hopic, init_version, submittable_v
     if version_build:
         expected_publish_version += f"+{version_build}"
 
-    expected = [
+    expected = _ExpectQueue((
         ('echo', 'build-a', init_version),
         ('echo', 'build-a', expected_publish_version),
-    ]
+    ))
 
-    def mock_check_call(args, *popenargs, **kwargs):
-        assert tuple(args) == expected.pop(0)
-
-    monkeypatch.setattr(subprocess, 'check_call', mock_check_call)
+    monkeypatch.setattr(subprocess, 'check_call', expected)
 
     # Successful checkout and build
     cmds = (
@@ -1320,92 +1312,74 @@ def test_post_submit(run_hopic, capfd, monkeypatch, commit_message, expected_ver
     project_name = 'test-project'
     init_version = '0.0.0'
 
-    expected_post_submit_commands = [
+    expected_post_submit_commands = _ExpectQueue((
         ('echo', f"{username} {password}"),
-    ]
+    ))
     if expected_version:
         expected_post_submit_commands.append(('echo', 'on new version only'),)
 
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with (run_hopic.toprepo / 'hopic-ci-config.yaml').open('w') as f:
-            f.write(dedent(f'''\
-                    project-name: {project_name}
-                    version:
-                      format: semver
-                      tag:    true
-                      bump:
-                        policy: conventional-commits
-                        strict: yes
-
-                    phases:
-                      phase:
-                        variant:
-                          - echo "BUILD VERSION $VERSION"
-                      publish:
-                        variant:
-                          - run-on-change: 'new-version-only'
-                          - echo publish-a ${{PURE_VERSION}}
-
-                    post-submit:
-                      credential-step:
-                        - with-credentials:
-                            id: {credential_id}
-                        - echo "$USERNAME $PASSWORD"
-                      new-version-only-step:
-                        - run-on-change: 'new-version-only'
-                          sh: echo "on new version only"
-                    '''))
-        repo.index.add(('hopic-ci-config.yaml',))
-        repo.index.commit(message='chore: initial commit', **_commitargs)
-        repo.git.branch('master', move=True)
-        repo.create_tag(init_version)
-
-        # PR branch
-        repo.head.reference = repo.create_head('something-useful')
-        assert not repo.head.is_detached
-
-        # Some change
-        with (run_hopic.toprepo / 'something.txt').open('w') as f:
-            f.write('some text')
-        repo.index.add(('something.txt',))
-        repo.index.commit(message=commit_message, **_commitargs)
-
-        repo.git.checkout('something-useful')
-        assert not repo.head.is_detached
-
-        def get_credential_id(project_name_arg, cred_id):
-            assert credential_id == cred_id
-            assert project_name == project_name_arg
-            return username, password
-
-        monkeypatch.setattr(credentials, 'get_credential_by_id', get_credential_id)
+    repo = run_hopic.init_toprepo({'hopic-ci-config.yaml': dedent(f'''\
+            project-name: {project_name}
+            version:
+              format: semver
+              tag:    true
+              bump:
+                policy: conventional-commits
+                strict: yes
+
+            phases:
+              phase:
+                variant:
+                  - echo "BUILD VERSION $VERSION"
+              publish:
+                variant:
+                  - run-on-change: 'new-version-only'
+                  - echo publish-a ${{PURE_VERSION}}
+
+            post-submit:
+              credential-step:
+                - with-credentials:
+                    id: {credential_id}
+                - echo "$USERNAME $PASSWORD"
+              new-version-only-step:
+                - run-on-change: 'new-version-only'
+                  sh: echo "on new version only"
+            ''')}, tag=init_version, message='chore: initial commit')
+
+    # PR branch
+    repo.head.reference = repo.create_head('something-useful')
+    assert not repo.head.is_detached
+
+    # Some change
+    _commit(repo, commit_message, {'something.txt': 'some text'})
 
-        def prepare_subprocess_mock():
-            def mock_check_call(args, *popenargs, **kwargs):
-                assert tuple(args) == expected_post_submit_commands.pop(0)
+    def get_credential_id(project_name_arg, cred_id):
+        assert credential_id == cred_id
+        assert project_name == project_name_arg
+        return username, password
 
-            monkeypatch.setattr(subprocess, 'check_call', mock_check_call)
+    monkeypatch.setattr(credentials, 'get_credential_by_id', get_credential_id)
 
-        (*_, hopic_result) = run_hopic(
-            ('checkout-source-tree',
-             '--target-remote', run_hopic.toprepo,
-             '--target-ref', 'master',),
-            ('prepare-source-tree',
-             '--author-date', f"@{_git_time}",
-             '--commit-date', f"@{_git_time}",
-             '--author-name', _author.name,
-             '--author-email', _author.email,
-             'merge-change-request', '--source-remote', run_hopic.toprepo, '--source-ref', 'something-useful', '--title', commit_message),
-            ('build',),
-            prepare_subprocess_mock,
-            ('submit',)
-        )
+    (*_, hopic_result) = run_hopic(
+        ('checkout-source-tree',
+         '--target-remote', run_hopic.toprepo,
+         '--target-ref', 'master',),
+        ('prepare-source-tree',
+         '--author-date', f"@{_git_time}",
+         '--commit-date', f"@{_git_time}",
+         '--author-name', _author.name,
+         '--author-email', _author.email,
+         'merge-change-request', '--source-remote', run_hopic.toprepo, '--source-ref', 'something-useful', '--title', commit_message),
+        ('build',),
+        functools.partial(monkeypatch.setattr, subprocess, 'check_call', expected_post_submit_commands),
+        ('submit',)
+    )
 
-        assert hopic_result.exit_code == 0
-        assert not expected_post_submit_commands
-        if expected_version:
-            repo.git.checkout('master')
-            assert repo.git.describe() == expected_version
+    assert hopic_result.exit_code == 0
+    assert not expected_post_submit_commands
+    if expected_version:
+        repo.git.checkout('master')
+        assert repo.git.describe() == expected_version
 
 
 @pytest.mark.parametrize('commit_message, merge_message, expected_version, strict', (
@@ -1431,23 +1405,13 @@ def test_merge_commit_message_bump_error(capfd, run_hopic, commit_message, merge
     True
 ))
 def test_merge_branch_twice(run_hopic, monkeypatch, note_mismatch):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with open(run_hopic.toprepo / 'hopic-ci-config.yaml', 'w') as f:
-            f.write(dedent('''\
-                version:
-                  bump: no
-                '''))
-        repo.index.add(('hopic-ci-config.yaml',))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-        repo.head.reference = repo.create_head('feat/branch', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    repo = run_hopic.init_toprepo({'hopic-ci-config.yaml': _BUMP_NO_CONFIG})
+    base_commit = repo.head.commit
+    repo.head.reference = repo.create_head('feat/branch', base_commit)
+    assert not repo.head.is_detached
 
-        # Some change
-        with open(run_hopic.toprepo / 'something.txt', 'w') as f:
-            f.write('usable')
-        repo.index.add(('something.txt',))
-        repo.index.commit(message='feat: add something useful', **_commitargs)
+    # Some change
+    _commit(repo, 'feat: add something useful', {'something.txt': 'usable'})
 
     monkeypatch.setenv('GIT_COMMITTER_NAME' , 'My Name is Nobody')
     monkeypatch.setenv('GIT_COMMITTER_EMAIL', 'nobody@example.com')
@@ -1465,12 +1429,8 @@ def test_merge_branch_twice(run_hopic, monkeypatch, note_mismatch):
     (*_, result) = run_hopic(*checkout_and_merge, ('submit',),)
     assert result.exit_code == 0
 
-    with git.Repo(run_hopic.toprepo, expand_vars=False) as repo:
-        note = repo.git.notes('show', 'master', ref='hopic/master')
-        assert re.match(
-                r'^Committed-by: Hopic.*\nWith Python version: .*\nAnd with these installed packages:\n.*\bhopic\b',
-                note, flags=re.DOTALL | re.MULTILINE,
-            )
+    note = _read_note(repo, 'master')
+    assert _HOPIC_NOTE_RE.match(note)
 
     assert result.exit_code == 0
 
@@ -1488,25 +1448,17 @@ def test_merge_branch_twice(run_hopic, monkeypatch, note_mismatch):
 
 
 def test_add_hopic_config_file(run_hopic):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        with open(run_hopic.toprepo / 'something.txt', 'w') as f:
-            f.write('usable')
-        repo.index.add(('something.txt',))
-        base_commit = repo.index.commit(message='Initial commit', **_commitargs)
-
-        # PR branch
-        repo.head.reference = repo.create_head('something-useful', base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
-
-        with (run_hopic.toprepo / 'hopic-ci-config.yaml').open('w') as f:
-            f.write(dedent('''\
-                version:
-                    bump: no
-                '''))
+    repo = run_hopic.init_toprepo()
+    base_commit = _commit(repo, 'Initial commit', {'something.txt': 'usable'})
+
+    # PR branch
+    repo.head.reference = repo.create_head('something-useful', base_commit)
+    assert not repo.head.is_detached
 
-        repo.index.add(('hopic-ci-config.yaml',))
-        repo.index.commit(message='chore: add hopic config file', **_commitargs)
+    (run_hopic.toprepo / 'hopic-ci-config.yaml').write_bytes(_BUMP_NO_CONFIG)
+
+    repo.index.add(('hopic-ci-config.yaml',))
+    _commit(repo, 'chore: add hopic config file')
 
     # Successful checkout and build
     (*_, result) = run_hopic(
@@ -1518,6 +1470,33 @@ def test_add_hopic_config_file(run_hopic):
     assert result.exit_code == 0
 
 
+_HOTFIX_CONFIG = Template(dedent(
+    """\
+    version:
+      tag: yes
+      format: semver
+      bump: $bump
+      hotfix-branch: '^hotfix/\\d+\\.\\d+\\.\\d+-(?P<id>[a-zA-Z](?:[-.a-zA-Z0-9]*[a-zA-Z0-9])?)$$'
+      hotfix-allowed-start-tags:
+        - ci
+    $file
+    """
+))
+
+
+@pytest.fixture(
+    scope="module",
+    params=(
+        {"policy": "constant", "field": "patch"},
+        {"policy": "conventional-commits", "strict": True},
+    ),
+    ids=lambda bp: bp["policy"],
+)
+def bump_policy(request):
+    """The version bump policies that support hotfixes."""
+    return request.param
+
+
 @pytest.mark.parametrize("version_file", ("version.txt", None), ids=lambda fn: fn or "{tag}")
 @pytest.mark.parametrize(
     "prepare_source_tree",
@@ -1526,64 +1505,46 @@ def test_add_hopic_config_file(run_hopic):
         "apply-modality-change",
     ),
 )
-@pytest.mark.parametrize(
-    "bump_policy",
-    (
-        {"policy": "constant", "field": "patch"},
-        {"policy": "conventional-commits", "strict": True},
-    ),
-    ids=lambda bp: bp["policy"],
-)
 def test_hotfix_change_on_release(bump_policy, prepare_source_tree, run_hopic, version_file):
     init_version = "1.2.3"
     hotfix_id = "vindyne.mem-leak"
     expected_version = f"1.2.4-hotfix.{hotfix_id}"
     hotfix_branch = f"hotfix/{init_version}-{hotfix_id}"
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        cfg_file = "hopic-ci-config.yaml"
-
-        (run_hopic.toprepo / cfg_file).write_text(
-            dedent(
-                f"""\
-                version:
-                  tag: yes
-                  format: semver
-                  bump: {json.dumps(bump_policy)}
-                  hotfix-branch: '^hotfix/\\d+\\.\\d+\\.\\d+-(?P<id>[a-zA-Z](?:[-.a-zA-Z0-9]*[a-zA-Z0-9])?)$'
-                  hotfix-allowed-start-tags:
-                    - ci
-                  {("file: " + version_file) if version_file else ""}
-
-                modality-source-preparation:
-                  CHANGE:
-                    - sh: touch new-file.txt
-                      changed-files:
-                        - new-file.txt
-                      commit-message: "fix: add new file"
-                """
-            )
+    repo = run_hopic.init_toprepo()
+    cfg_file = "hopic-ci-config.yaml"
+
+    (run_hopic.toprepo / cfg_file).write_text(
+        _HOTFIX_CONFIG.substitute(bump=json.dumps(bump_policy), file=f"  file: {version_file}" if version_file else "")
+        + dedent(
+            """\
+            modality-source-preparation:
+              CHANGE:
+                - sh: touch new-file.txt
+                  changed-files:
+                    - new-file.txt
+                  commit-message: "fix: add new file"
+            """
         )
-        repo.index.add((cfg_file,))
+    )
+    paths = [cfg_file]
 
-        if version_file:
-            (run_hopic.toprepo / version_file).write_text(f"version={init_version}")
-            repo.index.add((version_file,))
+    if version_file:
+        (run_hopic.toprepo / version_file).write_text(f"version={init_version}")
+        paths.append(version_file)
+    repo.index.add(paths)
 
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.create_tag(init_version)
-        repo.git.branch(hotfix_branch, move=True)
+    base_commit = _commit(repo, "chore: initial commit")
+    repo.create_tag(init_version)
+    _rename_branch(repo, hotfix_branch)
 
-        if bump_policy["policy"] == "conventional-commits":
-            base_commit = repo.index.commit(message="ci: prepare for hotfix", **_commitargs)
+    if bump_policy["policy"] == "conventional-commits":
+        base_commit = _commit(repo, "ci: prepare for hotfix")
 
-        # PR branch
-        repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    # PR branch
+    repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
+    assert not repo.head.is_detached
 
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message="fix: work around oom kill due to memory leak", **_commitargs)
+    _commit(repo, "fix: work around oom kill due to memory leak", {"something.txt": "usable"})
 
     # Successful checkout and build
     (result,) = run_hopic(
@@ -1632,63 +1593,39 @@ def test_hotfix_change_on_release(bump_policy, prepare_source_tree, run_hopic, v
         raise result.exception
     assert result.exit_code == 0
 
-    with git.Repo(run_hopic.toprepo) as repo:
-        # Switch back to hotfix branch to be able to easily look at its contents
-        repo.git.checkout(hotfix_branch)
+    # Switch back to hotfix branch to be able to easily look at its contents
+    repo.git.checkout(hotfix_branch)
 
-        assert repo.tags[expected_version].commit == repo.head.commit
+    assert repo.tags[expected_version].commit == repo.head.commit
 
 
-@pytest.mark.parametrize(
-    "bump_policy",
-    (
-        {"policy": "constant", "field": "patch"},
-        {"policy": "conventional-commits", "strict": True},
-    ),
-    ids=lambda bp: bp["policy"],
-)
 @pytest.mark.parametrize("unrelated_tag", (None, "1.2.4-rc1"), ids=lambda t: t or "{no-tag}")
 def test_hotfix_change_off_release(bump_policy, run_hopic, unrelated_tag):
     init_version = "1.2.3"
     hotfix_id = "vindyne.mem-leak"
     hotfix_branch = f"hotfix/{init_version}-{hotfix_id}"
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        cfg_file = "hopic-ci-config.yaml"
+    repo = run_hopic.init_toprepo()
+    cfg_file = "hopic-ci-config.yaml"
 
-        (run_hopic.toprepo / cfg_file).write_text(
-            dedent(
-                f"""\
-                version:
-                  tag: yes
-                  format: semver
-                  bump: {json.dumps(bump_policy)}
-                  hotfix-branch: '^hotfix/\\d+\\.\\d+\\.\\d+-(?P<id>[a-zA-Z](?:[-.a-zA-Z0-9]*[a-zA-Z0-9])?)$'
-                  hotfix-allowed-start-tags:
-                    - ci
-                """
-            )
-        )
-        repo.index.add((cfg_file,))
+    (run_hopic.toprepo / cfg_file).write_text(_HOTFIX_CONFIG.substitute(bump=json.dumps(bump_policy), file=""))
+    repo.index.add((cfg_file,))
 
-        repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.create_tag(init_version)
-        repo.git.branch(hotfix_branch, move=True)
+    _commit(repo, "chore: initial commit")
+    repo.create_tag(init_version)
+    _rename_branch(repo, hotfix_branch)
 
-        base_commit = repo.index.commit(message="fix: unrelated cosmetic problem", **_commitargs)
-        if unrelated_tag:
-            repo.create_tag(unrelated_tag)
+    base_commit = _commit(repo, "fix: unrelated cosmetic problem")
+    if unrelated_tag:
+        repo.create_tag(unrelated_tag)
 
-        if bump_policy["policy"] == "conventional-commits":
-            base_commit = repo.index.commit(message="ci: prepare for hotfix", **_commitargs)
+    if bump_policy["policy"] == "conventional-commits":
+        base_commit = _commit(repo, "ci: prepare for hotfix")
 
-        # PR branch
-        repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    # PR branch
+    repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
+    assert not repo.head.is_detached
 
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message="fix: work around oom kill due to memory leak", **_commitargs)
+    _commit(repo, "fix: work around oom kill due to memory leak", {"something.txt": "usable"})
 
     # Successful checkout and build
     (*_, result) = run_hopic(
@@ -1709,36 +1646,33 @@ def test_hotfix_double_bump(run_hopic):
     hotfix_id = "vindyne.mem-leak"
     expected_version = f"1.2.4-hotfix.{hotfix_id}.1"
     hotfix_branch = f"hotfix/{init_version}-{hotfix_id}"
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        cfg_file = "hopic-ci-config.yaml"
+    repo = run_hopic.init_toprepo()
+    cfg_file = "hopic-ci-config.yaml"
 
-        (run_hopic.toprepo / cfg_file).write_text(
-            dedent(
-                """\
-                version:
-                  tag: yes
-                  format: semver
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
-                  hotfix-branch: '^hotfix/\\d+\\.\\d+\\.\\d+-(?P<id>[a-zA-Z](?:[-.a-zA-Z0-9]*[a-zA-Z0-9])?)$'
-                """
-            )
+    (run_hopic.toprepo / cfg_file).write_text(
+        dedent(
+            """\
+            version:
+              tag: yes
+              format: semver
+              bump:
+                policy: conventional-commits
+                strict: yes
+              hotfix-branch: '^hotfix/\\d+\\.\\d+\\.\\d+-(?P<id>[a-zA-Z](?:[-.a-zA-Z0-9]*[a-zA-Z0-9])?)$'
+            """
         )
-        repo.index.add((cfg_file,))
+    )
+    repo.index.add((cfg_file,))
 
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.create_tag(init_version)
-        repo.git.branch(hotfix_branch, move=True)
+    base_commit = _commit(repo, "chore: initial commit")
+    repo.create_tag(init_version)
+    _rename_branch(repo, hotfix_branch)
 
-        # PR branch 1
-        repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    # PR branch 1
+    repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
+    assert not repo.head.is_detached
 
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message="fix: work around oom kill due to memory leak", **_commitargs)
+    _commit(repo, "fix: work around oom kill due to memory leak", {"something.txt": "usable"})
 
     # Successful checkout and build
     (*_, result) = run_hopic(
@@ -1750,17 +1684,15 @@ def test_hotfix_double_bump(run_hopic):
     )
     assert result.exit_code == 0
 
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        repo.git.checkout(hotfix_branch)
-        repo.index.commit(message="chore: intermediate commit 1 to increase commit distance", **_commitargs)
-        repo.index.commit(message="chore: intermediate commit 2 to increase commit distance", **_commitargs)
-        repo.index.commit(message="chore: intermediate commit 3 to increase commit distance", **_commitargs)
+    repo.git.checkout(hotfix_branch)
+    _commit(repo, "chore: intermediate commit 1 to increase commit distance")
+    _commit(repo, "chore: intermediate commit 2 to increase commit distance")
+    _commit(repo, "chore: intermediate commit 3 to increase commit distance")
 
-        # PR branch 2
-        repo.head.reference = repo.create_head("fix/out-of-bounds-access", repo.head.commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
-        repo.index.commit(message="fix: skip out of bounds read", **_commitargs)
+    # PR branch 2
+    repo.head.reference = repo.create_head("fix/out-of-bounds-access", repo.head.commit)
+    assert not repo.head.is_detached
+    _commit(repo, "fix: skip out of bounds read")
 
     (*_, result) = run_hopic(
         ("checkout-source-tree", "--target-remote", run_hopic.toprepo, "--target-ref", hotfix_branch),
@@ -1776,70 +1708,35 @@ def test_hotfix_double_bump(run_hopic):
     )
     assert result.exit_code == 0
 
-    with git.Repo(run_hopic.toprepo) as repo:
-        # Switch back to hotfix branch to be able to easily look at its contents
-        repo.git.checkout(hotfix_branch)
+    # Switch back to hotfix branch to be able to easily look at its contents
+    repo.git.checkout(hotfix_branch)
 
-        assert repo.tags[expected_version].commit == repo.head.commit
+    assert repo.tags[expected_version].commit == repo.head.commit
 
 
 @pytest.mark.parametrize(
-    "hotfix_id, error_msg",
+    "hotfix_id, matches_error",
     (
-        ("42indi"  , re.compile(r"Hotfix ID '.*?' is not a valid identifier")),
-        ("-42"     , re.compile(r"Hotfix ID '.*?' is not a valid identifier")),
-        ("-abc"    , re.compile(r"Hotfix ID '.*?' is not a valid identifier")),
-        ("abc-"    , re.compile(r"Hotfix ID '.*?' is not a valid identifier")),
-        ("abc/42"  , re.compile(r"Hotfix ID '.*?' is not a valid identifier")),
-        ("a"       , re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("a42"     , re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("a-42"    , re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("a.42"    , re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("a-test-1", re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("b"       , re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("rc"      , re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("alpha"   , re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("beta"    , re.compile(r"Hotfix ID '.*?' starts with reserved prefix")),
-        ("awesomeness-{init_version}-something", re.compile(r"Hotfix ID 'awesomeness-(.*?)-something' is not allowed to contain the base version '\1'")),
+        *((hotfix_id, _HOTFIX_ID_INVALID_RE.search) for hotfix_id in ("42indi", "-42", "-abc", "abc-", "abc/42")),
+        *((hotfix_id, _HOTFIX_ID_RESERVED_RE.search) for hotfix_id in ("a", "a42", "a-42", "a.42", "a-test-1", "b", "rc", "alpha", "beta")),
+        ("awesomeness-{init_version}-something", _HOTFIX_ID_CONTAINS_VERSION_RE.search),
     ),
     ids=lambda x: x if isinstance(x, str) else "",
 )
-def test_hotfix_invalid_id(error_msg, hotfix_id, run_hopic):
+def test_hotfix_invalid_id(hotfix_id, matches_error, run_hopic):
     init_version = "1.2.3"
     hotfix_id = hotfix_id.format(init_version=init_version)
     hotfix_branch = f"hotfix/{init_version}-{hotfix_id}"
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        cfg_file = "hopic-ci-config.yaml"
-
-        (run_hopic.toprepo / cfg_file).write_text(
-            dedent(
-                """\
-                version:
-                  tag: yes
-                  format: semver
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
-                  hotfix-branch: '^hotfix/\\d+\\.\\d+\\.\\d+-(?P<id>.*)$'
-                """
-            )
-        )
-        repo.index.add((cfg_file,))
-
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.create_tag(init_version)
-        repo.git.branch(hotfix_branch, move=True)
+    repo = run_hopic.init_toprepo({"hopic-ci-config.yaml": _STRICT_HOTFIX_CONFIG}, tag=init_version, message="chore: initial commit")
+    base_commit = repo.tags[init_version].commit
+    repo.create_head(hotfix_branch, base_commit)
 
-        # PR branch
-        repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    # PR branch
+    repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
+    assert not repo.head.is_detached
 
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message="fix: work around oom kill due to memory leak", **_commitargs)
+    _commit(repo, "fix: work around oom kill due to memory leak", {"something.txt": "usable"})
 
-    # Successful checkout and build
     (*_, result) = run_hopic(
         ("checkout-source-tree", "--target-remote", run_hopic.toprepo, "--target-ref", hotfix_branch),
         ("prepare-source-tree", "--author-name", _author.name, "--author-email", _author.email,
@@ -1850,51 +1747,30 @@ def test_hotfix_invalid_id(error_msg, hotfix_id, run_hopic):
     if not isinstance(result.exception, VersioningError):
         raise result.exception
     err = result.exception.format_message()
-    assert error_msg.search(err)
+    assert matches_error(err)
 
 
 @pytest.mark.parametrize(
-    "msg_tag, error_msg",
+    "msg_tag, matches_error",
     (
-        ("refactor!", re.compile("[Bb]reaking changes are not allowed [io]n hotfix")),
-        ("feat", re.compile("[Nn]ew features are not allowed [io]n hotfix")),
+        ("refactor!", _HOTFIX_BREAKING_RE.search),
+        ("feat", _HOTFIX_FEATURE_RE.search),
     ),
     ids=("breaking-change", "new-feature"),
 )
-def test_hotfix_rejects(error_msg, msg_tag, run_hopic):
+def test_hotfix_rejects(matches_error, msg_tag, run_hopic):
     init_version = "1.2.3"
     hotfix_id = "vindyne"
     hotfix_branch = f"hotfix/{init_version}-{hotfix_id}"
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        cfg_file = "hopic-ci-config.yaml"
+    repo = run_hopic.init_toprepo({"hopic-ci-config.yaml": _STRICT_HOTFIX_CONFIG}, tag=init_version, message="chore: initial commit")
+    base_commit = repo.tags[init_version].commit
+    _rename_branch(repo, hotfix_branch)
 
-        (run_hopic.toprepo / cfg_file).write_text(
-            dedent(
-                """\
-                version:
-                  tag: yes
-                  format: semver
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
-                  hotfix-branch: '^hotfix/\\d+\\.\\d+\\.\\d+-(?P<id>.*)$'
-                """
-            )
-        )
-        repo.index.add((cfg_file,))
+    # PR branch
+    repo.head.reference = repo.create_head("pr-42", base_commit)
+    assert not repo.head.is_detached
 
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
-        repo.create_tag(init_version)
-        repo.git.branch(hotfix_branch, move=True)
-
-        # PR branch
-        repo.head.reference = repo.create_head("pr-42", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
-
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message=f"{msg_tag}: blorg the oompsie vatsaat", **_commitargs)
+    _commit(repo, f"{msg_tag}: blorg the oompsie vatsaat", {"something.txt": "usable"})
 
     # Successful checkout and build
     (*_, result) = run_hopic(
@@ -1907,7 +1783,37 @@ def test_hotfix_rejects(error_msg, msg_tag, run_hopic):
     if not isinstance(result.exception, VersioningError):
         raise result.exception
     err = result.exception.format_message()
-    assert error_msg.search(err)
+    assert matches_error(err)
+
+
+_NEW_VERSION_ONLY_CONFIG = Template(dedent(
+    """\
+    version:
+      tag: $tag
+      format: semver
+      bump:
+        policy: conventional-commits
+        strict: yes
+      hotfix-branch: '^hotfix/(?P<id>.+)$$'
+    $file
+
+    phases:
+      always:
+        pre-submit:
+          - echo "build always"
+      new-version-only-step:
+        pre-submit:
+          - run-on-change: new-version-only
+            sh: echo "build on new version only"
+
+    post-submit:
+      always:
+        - echo "post submit always"
+      new-version-only-step:
+        - run-on-change: new-version-only
+          sh: echo "post submit on new version only"
+    """
+))
 
 
 @pytest.mark.parametrize("version_file", ("version.txt", None), ids=lambda fn: fn or "{tag}")
@@ -1917,70 +1823,33 @@ def test_new_version_only(branch_name, run_hopic, monkeypatch, version_file):
     hotfix_id = "vindyne.mem-leak"
     branch = branch_name.format(hotfix_id=hotfix_id)
 
-    expected_build_commands = [
+    expected_build_commands = _ExpectQueue((
         ("echo", "build always"),
         ("echo", "build on new version only"),
-    ]
-    expected_post_submit_commands = [
+    ))
+    expected_post_submit_commands = _ExpectQueue((
         ("echo", "post submit always"),
         ("echo", "post submit on new version only"),
-    ]
-
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        cfg_file = "hopic-ci-config.yaml"
-
-        (run_hopic.toprepo / cfg_file).write_text(
-            dedent(
-                f"""\
-                version:
-                  tag: {bool(not version_file)}
-                  format: semver
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
-                  hotfix-branch: '^hotfix/(?P<id>.+)$'
-                  {("file: " + version_file) if version_file else ""}
-
-                phases:
-                  always:
-                    pre-submit:
-                      - echo "build always"
-                  new-version-only-step:
-                    pre-submit:
-                      - run-on-change: new-version-only
-                        sh: echo "build on new version only"
-
-                post-submit:
-                  always:
-                    - echo "post submit always"
-                  new-version-only-step:
-                    - run-on-change: new-version-only
-                      sh: echo "post submit on new version only"
-                """
-            )
-        )
-        repo.index.add((cfg_file,))
-
-        if version_file:
-            (run_hopic.toprepo / version_file).write_text(f"version={init_version}")
-            repo.index.add((version_file,))
+    ))
 
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
-        if not version_file:
-            repo.create_tag(init_version)
-        repo.git.branch(branch, move=True)
+    files = {
+        "hopic-ci-config.yaml": _NEW_VERSION_ONLY_CONFIG.substitute(
+            tag=bool(not version_file),
+            file=f"  file: {version_file}" if version_file else "",
+        ),
+    }
+    if version_file:
+        files[version_file] = f"version={init_version}"
 
-        # PR branch
-        repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    repo = run_hopic.init_toprepo(files, tag=None if version_file else init_version, message="chore: initial commit")
+    base_commit = repo.head.commit
+    _rename_branch(repo, branch)
 
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message="fix: work around oom kill due to memory leak", **_commitargs)
+    # PR branch
+    repo.head.reference = repo.create_head("fix/mem-leak", base_commit)
+    assert not repo.head.is_detached
 
-    def mock_check_call(expected, args, *popenargs, **kwargs):
-        assert tuple(args) == expected.pop(0)
+    _commit(repo, "fix: work around oom kill due to memory leak", {"something.txt": "usable"})
 
     # Successful checkout, build and submit
     (*_, result) = run_hopic(
@@ -1989,17 +1858,9 @@ def mock_check_call(expected, args, *popenargs, **kwargs):
          "--author-date", f"@{_git_time}", "--commit-date", f"@{_git_time}",
          "merge-change-request", "--source-remote", run_hopic.toprepo, "--source-ref", "fix/mem-leak",
          "--change-request", "42", "--title", "fix: work around oom kill due to memory leak"),
-        functools.partial(
-            monkeypatch.setattr,
-            "subprocess.check_call",
-            functools.partial(mock_check_call, expected_build_commands),
-        ),
+        functools.partial(monkeypatch.setattr, "subprocess.check_call", expected_build_commands),
         ("build",),
-        functools.partial(
-            monkeypatch.setattr,
-            "subprocess.check_call",
-            functools.partial(mock_check_call, expected_post_submit_commands),
-        ),
+        functools.partial(monkeypatch.setattr, "subprocess.check_call", expected_post_submit_commands),
         ("submit",),
     )
 
@@ -2009,31 +1870,14 @@ def mock_check_call(expected, args, *popenargs, **kwargs):
 
 
 def test_no_initial_version(run_hopic):
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        base_commit = repo.index.commit(message="Initial commit", **_commitargs)
-
-        # PR branch
-        repo.head.reference = repo.create_head("something-useful", base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
-
-        (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
-            dedent(
-                """\
-                version:
-                  format: semver
-                  tag: true
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
-                """
-            )
-        )
+    repo = run_hopic.init_toprepo()
+    base_commit = _commit(repo, "Initial commit", {"something.txt": "usable"})
+
+    # PR branch
+    repo.head.reference = repo.create_head("something-useful", base_commit)
+    assert not repo.head.is_detached
 
-        repo.index.add(("hopic-ci-config.yaml",))
-        repo.index.commit(message="chore: add hopic config file", **_commitargs)
+    _commit(repo, "chore: add hopic config file", {"hopic-ci-config.yaml": _STRICT_CONVENTIONAL_CONFIG.substitute(strict="yes")})
 
     # Successful checkout and build
     (*_, result) = run_hopic(
@@ -2051,31 +1895,15 @@ def test_no_initial_version(run_hopic):
 
 def test_merge_to_non_publishable_branch(run_hopic):
     pr_branch = "fix/mem-leak"
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
-            dedent(
-                """\
-                version:
-                  format: semver
-                  tag: true
-                  bump:
-                    policy: conventional-commits
-                    strict: yes
-
-                publish-from-branch: 'frietjes'
-                """
-            )
-        )
-        repo.index.add(("hopic-ci-config.yaml",))
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
+    repo = run_hopic.init_toprepo()
+    base_commit = _commit(repo, "chore: initial commit", {
+        "hopic-ci-config.yaml": _STRICT_CONVENTIONAL_CONFIG.substitute(strict="yes") + "publish-from-branch: 'frietjes'\n",
+    })
 
-        repo.head.reference = repo.create_head(pr_branch, base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    repo.head.reference = repo.create_head(pr_branch, base_commit)
+    assert not repo.head.is_detached
 
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message="fix: work around oom kill due to memory leak", **_commitargs)
+    _commit(repo, "fix: work around oom kill due to memory leak", {"something.txt": "usable"})
 
     (*_, result) = run_hopic(
         ("checkout-source-tree", "--target-remote", run_hopic.toprepo, "--target-ref", 'master'),
@@ -2090,36 +1918,33 @@ def test_merge_with_pip_constraints(run_hopic, monkeypatch):
     packages = ("dummy>=0.8.0",)
 
     pr_branch = "fix/mem-leak"
-    with git.Repo.init(run_hopic.toprepo, expand_vars=False) as repo:
-        (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
-            dedent(
-                f"""\
-                pip:
-                - packages: {json.dumps(packages)}
-                """
-            )
+    repo = run_hopic.init_toprepo()
+    (run_hopic.toprepo / "hopic-ci-config.yaml").write_text(
+        dedent(
+            f"""\
+            pip:
+            - packages: {json.dumps(packages)}
+            """
         )
+    )
 
-        constraints_file = run_hopic.toprepo / "constraints_test.txt"
-        constraints_file.write_text(constraints)
+    constraints_file = run_hopic.toprepo / "constraints_test.txt"
+    constraints_file.write_text(constraints)
 
-        def mock_check_call(args, *popenargs, **kwargs):
-            assert args[2:5] == ["pip", "install", "-c"]
-            with open(args[5]) as f:
-                assert constraints in f.read()
+    def mock_check_call(args, *popenargs, **kwargs):
+        assert args[2:5] == ["pip", "install", "-c"]
+        with open(args[5]) as f:
+            assert constraints in f.read()
 
-        monkeypatch.setattr(subprocess, "check_call", mock_check_call)
+    monkeypatch.setattr(subprocess, "check_call", mock_check_call)
 
-        repo.index.add(("hopic-ci-config.yaml",))
-        base_commit = repo.index.commit(message="chore: initial commit", **_commitargs)
+    repo.index.add(("hopic-ci-config.yaml",))
+    base_commit = _commit(repo, "chore: initial commit")
 
-        repo.head.reference = repo.create_head(pr_branch, base_commit)
-        assert not repo.head.is_detached
-        repo.head.reset(index=True, working_tree=True)
+    repo.head.reference = repo.create_head(pr_branch, base_commit)
+    assert not repo.head.is_detached
 
-        (run_hopic.toprepo / "something.txt").write_text("usable")
-        repo.index.add(("something.txt",))
-        repo.index.commit(message="fix: work around oom kill due to memory leak", **_commitargs)
+    _commit(repo, "fix: work around oom kill due to memory leak", {"something.txt": "usable"})
 
     (*_, result) = run_hopic(
         ("checkout-source-tree", "--target-remote", run_hopic.toprepo, "--target-ref", "master"),